@@ -1,86 +1,156 @@
 from .solver import Solver
+from .assignment import assignment_heuristic
+from .batch_heuristic import BatchHeuristic, NUMPY_AVAILABLE
+from .deadlock import Pruner
+from .level import Level
+from .search_state import SearchState
 from sokoban.map import Map
 from sokoban.moves import *
 import heapq
 import math
-from sokoban.map import OBSTACLE_SYMBOL
 
 
 class AStarSolver(Solver):
     """
-    A* solver using Manhattan-distance heuristic for boxes.
+    A* solver using a walk-distance matching heuristic for boxes.
     Chooses paths that minimize f(n) = g(n) + h(n),
     where g(n) is the number of moves so far, and h(n) is the estimated cost to goal.
+    h is admissible and consistent for move counts with pulls allowed, so the answer
+    has the fewest moves.
+    With batch=True (and numpy installed) the children of each expansion are scored
+    in one vectorized BatchHeuristic call instead of one matching per child.
+    A `pruner` (e.g. DeadlockDetector) drops children whose moved box it reports dead.
+    There is none by default: pulls can free boxes that pushes alone never could.
     """
 
-    def heuristic(self, state: Map) -> int:
+    def __init__(
+        self,
+        map: Map,
+        batch: bool = False,
+        pruner: Pruner | None = None
+    ) -> None:
+        super().__init__(map)
+        # Static tables (dead squares, push distances) are built once per level here
+        self.level = Level(map)
+        self.batch_heuristic = BatchHeuristic(self.level, pulls=True) if batch and NUMPY_AVAILABLE else None
+        self.pruner = pruner
+
+    def pruned(self, state: SearchState, move: int, box_from: int) -> bool:
         """
-        Heuristic function: sum of minimum Manhattan distances
-        from each box to the closest target.
+        True if `move` (just applied with do_move) moved a box and the pruner reports the
+        result dead. A pushed or pulled box always lands one step from where it started.
         """
-        # Deadlock detection: if any box (not on target) is in a static corner, return very high heuristic
-        for (bx, by) in state.positions_of_boxes:
-            if (bx, by) in state.targets:
-                continue
-            up = bx-1 < 0 or state.map[bx-1][by] == OBSTACLE_SYMBOL
-            down = bx+1 >= state.length or state.map[bx+1][by] == OBSTACLE_SYMBOL
-            left = by-1 < 0 or state.map[bx][by-1] == OBSTACLE_SYMBOL
-            right = by+1 >= state.width or state.map[bx][by+1] == OBSTACLE_SYMBOL
-            if (up and left) or (up and right) or (down and left) or (down and right):
-                return 10**6
-        total = 0
-        for (bx, by) in state.positions_of_boxes:
-            dmin = math.inf
-            for (tx, ty) in state.targets:
-                d = abs(bx - tx) + abs(by - ty)
-                if d < dmin:
-                    dmin = d
-            total += dmin
-        return total
+        return box_from >= 0 and self.pruner is not None and \
+            self.pruner.is_deadlock(state, box_from + self.level.deltas[move])
+
+    def heuristic(self, state: SearchState) -> int:
+        """
+        Heuristic function: cost of the cheapest matching of boxes to distinct targets,
+        where each box -> target edge is the walk distance around walls. Push distances
+        and push-dead squares would overestimate: a pull can move a box where no push can.
+        """
+        return assignment_heuristic(self.level, state.boxes, self.level.walk_dist)
 
     def solve(self) -> list[int] | None:
         """
         Runs A* search to find a solution.
         Returns a list of moves (as integers), or None if no solution is found.
         """
-        start = self.map.copy()
-        start_key = str(start)
+        state = SearchState.from_map(self.map, self.level)
+        start_key = state.hash
+        stats = self.new_stats()
+        # Phase-timed when instrumented, otherwise the plain functions
+        heappush = self.timed('heap', heapq.heappush)
+        heappop = self.timed('heap', heapq.heappop)
+        legal_moves = self.timed('successors', SearchState.legal_moves)
+        do_move = self.timed('successors', SearchState.do_move)
+        undo_move = self.timed('successors', SearchState.undo_move)
+        heuristic = self.timed('heuristic', self.heuristic)
+        score_batch = self.timed('heuristic', self._score_batch)
+        pruned = self.timed('deadlocks', self.pruned)
+        progress_at = self.next_progress()
 
-        # Open list as a min-heap priority queue
+        # Open list as a min-heap priority queue. Entries only hold the player cell and a
+        # tuple of box cells, which children share with their parent unless a box moved.
         open_heap = []
         entry_count = 0  # tie-breaker counter to avoid comparing states directly
 
         # Push the initial state with f = h(start), g = 0
-        heapq.heappush(open_heap, (self.heuristic(start), 0, entry_count, start, []))
-        best_g = {start_key: 0}  # map state string -> best g(n)
+        start_boxes = tuple(state.boxes)
+        heapq.heappush(open_heap, (self.heuristic(state), 0, entry_count, start_key, state.player, start_boxes, []))
+        best_g = {start_key: 0}  # map state hash -> best g(n)
         entry_count += 1
 
+        # h only depends on the boxes, so it is cached on the box part of the hash;
+        # plain walking moves then never recompute the matching
+        player_keys = self.level.zobrist.player_keys
+        h_cache = {}
+
         while open_heap:
-            f, g, _, state, path = heapq.heappop(open_heap)
+            f, g, _, key, player, boxes, path = heappop(open_heap)
+            state.load(player, boxes, key)
 
             # Goal test
             if state.is_solved():
                 return path
 
-            # Expand current state
-            for move in state.filter_possible_moves():
-                nxt = state.copy()
-                nxt.apply_move(move)
-                new_g = g + 1
-                key = str(nxt)
+            # Expand current state in place, undoing each move after recording the child
+            stats.expanded += 1
+            if f - g < stats.best_h:
+                stats.best_h = f - g
+            if stats.expanded >= progress_at:
+                stats.bound = f
+                progress_at = self.report_progress()
+            new_g = g + 1
+            children = []
+            for move in legal_moves(state):
+                box_from = do_move(state, move)
+                key = state.hash
 
-                # If this path is better than any previously found for this state
-                if key not in best_g or new_g < best_g[key]:
+                # Only keep the child if this path is better than any previously found for it
+                if key in best_g and best_g[key] <= new_g:
+                    stats.duplicates += 1
+                elif pruned(state, move, box_from):
+                    stats.pruned += 1
+                else:
                     best_g[key] = new_g
-                    h = self.heuristic(nxt)
-                    heapq.heappush(open_heap, (
-                        new_g + h,  # f(n) = g(n) + h(n)
-                        new_g,
-                        entry_count,
-                        nxt,
-                        path + [move]
-                    ))
-                    entry_count += 1
+                    box_key = key ^ player_keys[state.player]
+                    h = h_cache.get(box_key)
+                    if h is None and self.batch_heuristic is None:
+                        h = h_cache[box_key] = heuristic(state)
+                    child_boxes = boxes if box_from < 0 else tuple(state.boxes)
+                    children.append((key, box_key, state.player, child_boxes, move, h))
+                undo_move(state, move, box_from)
+
+            if self.batch_heuristic is not None:
+                children = score_batch(children, h_cache)
+
+            stats.generated += len(children)
+            for key, _, player, child_boxes, move, h in children:
+                heappush(open_heap, (
+                    new_g + h,  # f(n) = g(n) + h(n)
+                    new_g,
+                    entry_count,
+                    key,
+                    player,
+                    child_boxes,
+                    path + [move]
+                ))
+                entry_count += 1
+            if len(open_heap) > stats.max_open:
+                stats.max_open = len(open_heap)
 
         # No solution found
-        return None
\ No newline at end of file
+        return None
+
+    def _score_batch(self, children: list[tuple], h_cache: dict[int, int]) -> list[tuple]:
+        """
+        Fills in the h-values still missing from `children` with a single BatchHeuristic call.
+        """
+        missing = [c for c in children if c[5] is None]
+        if missing:
+            values = self.batch_heuristic([c[3] for c in missing])
+            for c, h in zip(missing, values):
+                h_cache[c[1]] = int(h)
+        return [(key, box_key, player, boxes, move, h_cache[box_key])
+                for key, box_key, player, boxes, move, _ in children]
@@ -0,0 +1,173 @@
+from .a_star import AStarSolver
+from .deadlock import Pruner
+from .search_state import SearchState
+from sokoban.map import Map
+import heapq
+import math
+import time
+
+# How many expansions run between checks of the deadline
+DEADLINE_CHECK_INTERVAL = 256
+
+
+class AnytimeAStarSolver(AStarSolver):
+    """
+    Anytime Repairing A* (ARA*) over player moves, with the AStarSolver heuristic.
+    The first search orders the open list by g + weight * h and finds a solution
+    quickly; the weight then drops by `weight_step` down to 1, and every later search
+    reuses the g-values, open list and closed set of the previous one. States improved
+    after they were closed wait in an "inconsistent" list and rejoin the open list at
+    the next weight, so each pass only repairs what changed instead of starting over.
+    batch=True (with numpy) scores the children of each expansion in one BatchHeuristic
+    call, as in AStarSolver.
+    Every better solution is passed to `callback(moves, weight, bound)`, where `bound`
+    is the proven suboptimality factor (1.0 means optimal). The proof needs an
+    admissible h, which the inherited walk-distance matching is; a `pruner` voids it,
+    since a pruned state may lie on every shorter path. solve() stops at `deadline`
+    seconds and returns the best solution found so far, or None if there is none.
+    """
+
+    def __init__(
+        self,
+        map: Map,
+        weight: float = 3.0,
+        weight_step: float = 0.5,
+        deadline: float | None = None,
+        callback=None,
+        batch: bool = False,
+        pruner: Pruner | None = None
+    ) -> None:
+        super().__init__(map, batch=batch, pruner=pruner)
+        self.weight = weight
+        self.weight_step = weight_step
+        self.deadline = deadline
+        self.callback = callback
+
+    def solve(self) -> list[int] | None:
+        """
+        Runs ARA* until the solution is proven optimal or the deadline passes.
+        Returns the best list of moves found, or None if no solution was found in time.
+        """
+        state = SearchState.from_map(self.map, self.level)
+        stats = self.new_stats()
+        if state.is_solved():
+            return []
+        heappush = self.timed('heap', heapq.heappush)
+        heappop = self.timed('heap', heapq.heappop)
+        legal_moves = self.timed('successors', SearchState.legal_moves)
+        do_move = self.timed('successors', SearchState.do_move)
+        undo_move = self.timed('successors', SearchState.undo_move)
+        heuristic = self.timed('heuristic', self.heuristic)
+        score_batch = self.timed('heuristic', self._score_batch)
+        pruned = self.timed('deadlocks', self.pruned)
+        progress_at = self.next_progress()
+        stop_at = time.monotonic() + self.deadline if self.deadline is not None else math.inf
+
+        player_keys = self.level.zobrist.player_keys
+        h_cache = {}
+        start_key = state.hash
+        start_h = h_cache[start_key ^ player_keys[state.player]] = heuristic(state)
+
+        # g-values and back-links of every state generated so far; key -> (parent key, move)
+        best_g = {start_key: 0}
+        parents = {start_key: (None, 0)}
+        closed = set()
+        incons = {}  # key -> open entry, for states improved after they were closed
+        weight = max(self.weight, 1.0)
+        # Entries are (g + weight * h, -g, tie-breaker, key, player, boxes, h)
+        open_heap = [(weight * start_h, 0, 0, start_key, state.player, tuple(state.boxes), start_h)]
+        entry_count = 1
+
+        goal_key, goal_g = None, math.inf
+        best_moves, published_g = None, math.inf
+
+        while True:
+            # Expand until nothing left in the open list can beat the incumbent at this weight
+            while open_heap and open_heap[0][0] < goal_g:
+                f, neg_g, _, key, player, boxes, h = heappop(open_heap)
+                g = -neg_g
+                if best_g[key] < g or key in closed:
+                    continue  # stale entry
+                closed.add(key)
+                state.load(player, boxes, key)
+
+                stats.expanded += 1
+                if h < stats.best_h:
+                    stats.best_h = h
+                if stats.expanded >= progress_at:
+                    stats.bound = f
+                    progress_at = self.report_progress()
+                if stats.expanded % DEADLINE_CHECK_INTERVAL == 0 and time.monotonic() > stop_at:
+                    return best_moves
+
+                new_g = g + 1
+                children = []
+                for move in legal_moves(state):
+                    box_from = do_move(state, move)
+                    child = state.hash
+                    if best_g.get(child, math.inf) <= new_g:
+                        stats.duplicates += 1
+                    elif pruned(state, move, box_from):
+                        stats.pruned += 1
+                    else:
+                        best_g[child] = new_g
+                        parents[child] = (key, move)
+                        box_key = child ^ player_keys[state.player]
+                        child_h = h_cache.get(box_key)
+                        if child_h is None and self.batch_heuristic is None:
+                            child_h = h_cache[box_key] = heuristic(state)
+                        child_boxes = boxes if box_from < 0 else tuple(state.boxes)
+                        if state.is_solved() and new_g < goal_g:
+                            goal_key, goal_g = child, new_g
+                        children.append((child, box_key, state.player, child_boxes, move, child_h))
+                    undo_move(state, move, box_from)
+
+                if self.batch_heuristic is not None:
+                    children = score_batch(children, h_cache)
+
+                stats.generated += len(children)
+                for child, _, child_player, child_boxes, _, child_h in children:
+                    entry = (new_g + weight * child_h, -new_g, entry_count, child, child_player,
+                             child_boxes, child_h)
+                    entry_count += 1
+                    if child in closed:
+                        incons[child] = entry
+                    else:
+                        heappush(open_heap, entry)
+                if len(open_heap) > stats.max_open:
+                    stats.max_open = len(open_heap)
+
+            if goal_key is None:
+                return None  # the open list ran dry without reaching a goal
+
+            # No unsearched state can reach a goal in fewer than g + h moves (h is admissible),
+            # so the cheapest such sum over the open and inconsistent states bounds the optimum
+            frontier = [e for e in open_heap if best_g[e[3]] == -e[1]] + list(incons.values())
+            lower = min((-e[1] + e[6] for e in frontier), default=goal_g)
+            bound = min(weight, max(1.0, goal_g / lower)) if lower > 0 else 1.0
+            if goal_g < published_g:
+                best_moves, published_g = self._path(parents, goal_key), goal_g
+                if self.callback is not None:
+                    self.callback(best_moves, weight, bound)
+
+            if bound <= 1.0 or weight <= 1.0 or time.monotonic() > stop_at:
+                return best_moves
+
+            # Lower the weight and rebuild the open list from the open and inconsistent states
+            weight = max(1.0, weight - self.weight_step)
+            open_heap = [(-e[1] + weight * e[6],) + e[1:] for e in frontier]
+            heapq.heapify(open_heap)
+            incons = {}
+            closed = set()
+
+    def _path(self, parents: dict, key: int) -> list[int]:
+        """
+        Follows back-links from `key` to the start and returns the moves in order.
+        """
+        path = []
+        parent, move = parents[key]
+        while parent is not None:
+            path.append(move)
+            parent, move = parents[parent]
+        path.reverse()
+        return path
@@ -0,0 +1,164 @@
+from .level import Level, UNREACHABLE
+
+try:
+    import numpy as np
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+
+def _augment(cost, i: int, m: int, u: list[int], v: list[int], p: list[int], way: list[int]) -> None:
+    """
+    One phase of the Hungarian algorithm (potentials form, 1-indexed):
+    adds the free row `i` to the matching with a shortest augmenting path.
+    `cost(row, col)` gives the edge weights, `p[col]` the row matched to each column.
+    Requires feasible potentials with every matched edge tight, and keeps them so.
+    """
+    INF = float('inf')
+    p[0] = i
+    j0 = 0
+    minv = [INF] * (m + 1)
+    used = [False] * (m + 1)
+    while True:
+        used[j0] = True
+        i0 = p[j0]
+        delta = INF
+        j1 = 0
+        for j in range(1, m + 1):
+            if not used[j]:
+                cur = cost(i0, j) - u[i0] - v[j]
+                if cur < minv[j]:
+                    minv[j] = cur
+                    way[j] = j0
+                if minv[j] < delta:
+                    delta = minv[j]
+                    j1 = j
+        for j in range(m + 1):
+            if used[j]:
+                u[p[j]] += delta
+                v[j] -= delta
+            else:
+                minv[j] -= delta
+        j0 = j1
+        if p[j0] == 0:
+            break
+    while True:
+        j1 = way[j0]
+        p[j0] = p[j1]
+        j0 = j1
+        if j0 == 0:
+            break
+
+
+def min_cost_assignment(matrix: list[list[int]]) -> int:
+    """
+    Cost of the cheapest assignment of every row to a distinct column (rows <= columns).
+    Uses SciPy's linear_sum_assignment when available, a pure-Python Hungarian otherwise.
+    """
+    n = len(matrix)
+    if n == 0:
+        return 0
+    if SCIPY_AVAILABLE:
+        arr = np.asarray(matrix)
+        rows, cols = linear_sum_assignment(arr)
+        return int(arr[rows, cols].sum())
+
+    m = len(matrix[0])
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    cost = lambda i, j: matrix[i - 1][j - 1]
+    for i in range(1, n + 1):
+        _augment(cost, i, m, u, v, p, way)
+    return sum(matrix[p[j] - 1][j - 1] for j in range(1, m + 1) if p[j])
+
+
+def assignment_heuristic(level: Level, boxes, distances: dict | None = None) -> int:
+    """
+    Minimum total number of pushes to bring every box onto its own target,
+    matching boxes to targets on the level's push-distance matrix, or on
+    `distances` (target -> per-cell table) when given, e.g. level.walk_dist.
+    UNREACHABLE when there are more boxes than targets.
+    """
+    if len(boxes) > len(level.targets):
+        return UNREACHABLE
+    table = level.push_dist if distances is None else distances
+    matrix = [[table[t][b] for t in level.targets] for b in boxes]
+    return min_cost_assignment(matrix)
+
+
+class BoxAssignment:
+    """
+    Minimum-cost box -> target matching that is kept up to date as boxes are pushed.
+    Keeps the Hungarian potentials between calls, so moving a single box only needs
+    one augmenting phase (O(targets^2)) instead of a full re-solve. Extra targets are
+    covered by zero-cost dummy rows, and extra boxes by dummy targets no box can reach,
+    which keeps the problem square.
+    """
+
+    def __init__(self, level: Level, boxes) -> None:
+        boxes = list(boxes)
+        self.targets = list(level.targets)
+        self.push_dist = [level.push_dist[t] for t in self.targets]
+        self.m = max(len(self.targets), len(boxes))
+        self.rows = {}  # box cell -> row index (1-based)
+        self.cells = [0] * (self.m + 1)  # row index -> box cell, 0 for dummy rows
+        for i, box in enumerate(boxes, start=1):
+            self.rows[box] = i
+            self.cells[i] = box
+
+        m = self.m
+        self.u = [0] * (m + 1)
+        self.v = [0] * (m + 1)
+        self.p = [0] * (m + 1)
+        self.way = [0] * (m + 1)
+        for i in range(1, m + 1):
+            _augment(self._cost, i, m, self.u, self.v, self.p, self.way)
+
+    def _cost(self, i: int, j: int) -> int:
+        box = self.cells[i]
+        if not box:
+            return 0
+        return self.push_dist[j - 1][box] if j <= len(self.push_dist) else UNREACHABLE
+
+    def cost(self) -> int:
+        """
+        Current optimal matching cost, capped at UNREACHABLE if some box has no target.
+        """
+        total = 0
+        for j in range(1, self.m + 1):
+            if self.cells[self.p[j]]:
+                total += self._cost(self.p[j], j)
+        return min(total, UNREACHABLE)
+
+    def move_box(self, old: int, new: int) -> tuple:
+        """
+        Re-solves the matching after the box on `old` was pushed to `new`.
+        Returns a token that restore() uses to go back to the previous matching.
+        """
+        token = (old, new, self.u[:], self.v[:], self.p[:])
+        i = self.rows.pop(old)
+        self.rows[new] = i
+        self.cells[i] = new
+
+        # Free the row, lower its potential until every edge is feasible again, re-augment
+        m = self.m
+        p = self.p
+        for j in range(1, m + 1):
+            if p[j] == i:
+                p[j] = 0
+                break
+        self.u[i] = min(self._cost(i, j) - self.v[j] for j in range(1, m + 1))
+        _augment(self._cost, i, m, self.u, self.v, p, self.way)
+        return token
+
+    def restore(self, token: tuple) -> None:
+        """
+        Undoes a move_box call; tokens must be restored in reverse order.
+        """
+        old, new, self.u, self.v, self.p = token
+        i = self.rows.pop(new)
+        self.rows[old] = i
+        self.cells[i] = old
@@ -0,0 +1,187 @@
+import argparse
+import base64
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from registry import SOLVERS, solver_class, use_headless_sokoban
+
+# Nothing here plots: sokoban is loaded without its matplotlib/PIL imports, unless already loaded
+use_headless_sokoban()
+from sokoban.map import Map
+from search_methods.level_format import SET_EXTENSION, LevelSet, encode_moves
+from search_methods.solution_cache import SolutionCache, canonical_level, default_cache_path
+from benchmark import count_box_moves
+
+# Per-job timeouts interrupt the solver with SIGALRM, which Windows does not have
+ALARM_AVAILABLE = hasattr(signal, 'SIGALRM')
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame) -> None:
+    raise JobTimeout()
+
+
+def collect_jobs(sources: list[str]) -> list[tuple[str, Map]]:
+    """
+    Expands the command-line sources into (name, map) jobs: a directory stands for its
+    *.yaml files, a pattern for the files it matches, a .lvls level set for all of its
+    levels (named 'set.lvls#index'), and '-' for the level strings read from standard
+    input, separated by blank lines.
+    """
+    jobs = []
+    for source in sources:
+        if source == '-':
+            text = sys.stdin.read()
+            for i, block in enumerate(b for b in text.split('\n\n') if b.strip()):
+                jobs.append((f'stdin:{i}', Map.from_str(block)))
+            continue
+        if os.path.isdir(source):
+            paths = sorted(glob.glob(os.path.join(source, '*.yaml')))
+        elif os.path.exists(source):
+            paths = [source]
+        else:
+            paths = sorted(glob.glob(source))
+        for path in paths:
+            if path.endswith(SET_EXTENSION):
+                with LevelSet(path) as levels:
+                    jobs.extend((f'{path}#{i}', crt_map) for i, crt_map in enumerate(levels))
+            else:
+                jobs.append((path, Map.from_yaml(path)))
+    return jobs
+
+
+def _solve_job(job: tuple[str, str, Map, float | None]) -> dict:
+    """
+    Pool task: solves one map under the job timeout and checks the answer.
+    """
+    key, solver_key, crt_map, timeout = job
+    record = {'key': key, 'solver': SOLVERS[solver_key][0]}
+    if timeout and ALARM_AVAILABLE:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        solver = solver_class(solver_key)(crt_map)
+        moves = solver.solve()
+        record['status'] = 'solved' if moves is not None else 'failed'
+    except JobTimeout:
+        moves, record['status'] = None, 'timeout'
+    except MemoryError:
+        moves, record['status'] = None, 'memory'
+    except Exception as e:
+        moves, record['status'] = None, f'error: {e}'
+    finally:
+        if timeout and ALARM_AVAILABLE:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record['time'] = time.perf_counter() - start
+    if moves is not None:
+        if not count_box_moves(crt_map, moves)[2]:
+            moves, record['status'] = None, 'invalid'
+    record['moves'] = moves
+    return record
+
+
+def run_batch(jobs: list[tuple[str, Map]], solver_key: str, workers: int, timeout: float | None,
+              cache: SolutionCache, out, rle: bool = False) -> dict[str, int]:
+    """
+    Answers every job, writing one JSON line to `out` as soon as its result is known.
+    Levels cached for this solver are answered straight away; the rest are solved on a
+    process pool, once per distinct level, and every solution is added to the cache.
+    The pool's workers are not daemons, so engines that start processes of their own
+    (HDA*, the portfolio) can run in them.
+    With `rle`, moves are written as the base64 of their run-length encoding.
+    Returns how many jobs ended in each status, plus how many were 'cached'.
+    """
+    counts: dict[str, int] = {}
+
+    def emit(name: str, record: dict, moves: list[int] | None, cached: bool) -> None:
+        line = {
+            'map': name,
+            'key': record['key'],
+            'status': record['status'],
+            'cached': cached,
+            'solver': record['solver'],
+            'time': round(record['time'], 4),
+            'length': len(moves) if moves is not None else None,
+            'moves': moves if moves is None or not rle else base64.b64encode(encode_moves(moves)).decode(),
+        }
+        out.write(json.dumps(line) + '\n')
+        out.flush()
+        counts[record['status']] = counts.get(record['status'], 0) + 1
+        if cached:
+            counts['cached'] = counts.get('cached', 0) + 1
+
+    # Jobs waiting for the same canonical level are solved once
+    waiting: dict[str, list[tuple[str, Map]]] = {}
+    tasks = []
+    for name, crt_map in jobs:
+        key = canonical_level(crt_map)[0]
+        if key in waiting:
+            waiting[key].append((name, crt_map))
+            continue
+        moves = cache.get(crt_map, solver_key)
+        if moves is not None:
+            emit(name, {'key': key, 'status': 'solved', 'solver': 'cache', 'time': 0.0}, moves, True)
+        else:
+            waiting[key] = [(name, crt_map)]
+            tasks.append((key, solver_key, crt_map, timeout))
+
+    if not tasks:
+        return counts
+    with ProcessPoolExecutor(min(workers, len(tasks))) as pool:
+        for future in as_completed([pool.submit(_solve_job, task) for task in tasks]):
+            record = future.result()
+            (name, crt_map), *repeats = waiting.pop(record['key'])
+            moves = record['moves']
+            if moves is not None:
+                cache.put(crt_map, moves, solver_key, record['time'])
+            emit(name, record, moves, False)
+            # Copies of the level may differ in padding or player cell, so they get translated moves
+            for name, crt_map in repeats:
+                emit(name, record, cache.get(crt_map, solver_key) if moves is not None else None, True)
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Solve many Sokoban levels on a process pool.')
+    parser.add_argument('sources', nargs='+',
+                        help="map files, directories of *.yaml, glob patterns, or '-' for level strings on stdin")
+    parser.add_argument('--solver', default='push-astar', choices=list(SOLVERS),
+                        help='engine to solve with (default: push-astar)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='pool size (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds per level, 0 for none (default: 60)')
+    parser.add_argument('--output', help='JSONL file to append results to (default: stdout)')
+    parser.add_argument('--cache', default=default_cache_path(),
+                        help='solution cache file (default: $SOKOBAN_SOLUTION_CACHE or ~/.cache)')
+    parser.add_argument('--no-cache', action='store_true', help='do not read or write the persistent cache')
+    parser.add_argument('--rle', action='store_true', help='write moves as base64 run-length-encoded bytes')
+    args = parser.parse_args(argv)
+
+    jobs = collect_jobs(args.sources)
+    if not jobs:
+        parser.error('no levels found')
+    cache = SolutionCache(None if args.no_cache else args.cache)
+    out = open(args.output, 'a') if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        counts = run_batch(jobs, args.solver, args.workers, args.timeout or None, cache, out, args.rle)
+    finally:
+        if args.output:
+            out.close()
+        cache.close()
+    cached = counts.pop('cached', 0)
+    summary = ', '.join(f'{n} {status}' for status, n in sorted(counts.items()))
+    print(f'{len(jobs)} levels in {time.perf_counter() - started:.2f}s: {summary} '
+          f'({cached} answered from the cache)', file=sys.stderr)
+    return 0 if counts.get('solved', 0) == len(jobs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
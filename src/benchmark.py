@@ -0,0 +1,376 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from registry import SOLVERS, solver_class, use_headless_sokoban
+
+# Nothing here plots: sokoban is loaded without its matplotlib/PIL imports, unless already loaded
+use_headless_sokoban()
+from sokoban.map import Map
+from search_methods.level_format import level_refs, load_map, ref_name
+from search_methods.transitions import PULL_MOVES
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # not available on Windows
+    RESOURCE_AVAILABLE = False
+
+DEFAULT_SOLVERS = ['ida', 'astar', 'push-astar', 'push-ida', 'simanneal']
+
+# Import scenarios timed by --startup, each in a fresh interpreter started from this directory
+STARTUP_SCENARIOS = {
+    'interpreter': 'pass',
+    'headless solve': 'import registry; registry.use_headless_sokoban(); import sokoban.map, sokoban.moves; '
+                      'registry.solver_class("push-astar")',
+    'headless batch': 'import batch',  # as when batch.py is run directly
+    'sokoban package': 'import sokoban',
+    'every solver': 'import registry; registry.use_headless_sokoban(); '
+                    '[registry.solver_class(key) for key in registry.SOLVERS]',
+}
+# Packages a headless start should never load
+HEAVY_MODULES = ('matplotlib', 'PIL', 'pandas', 'seaborn')
+# Startup changes below this many seconds are noise
+STARTUP_NOISE = 0.005
+
+RUN_FIELDS = ['map', 'solver', 'repeat', 'status', 'time', 'nodes_expanded', 'nodes_generated',
+              'nodes_per_sec', 'peak_rss_mb', 'moves', 'pushes', 'pulls']
+
+
+def count_box_moves(crt_map: Map, moves: list[int]) -> tuple[int, int, bool]:
+    """
+    Replays `moves` on a copy of the map.
+    Returns (pushes, pulls, whether the final map is solved).
+    """
+    final = crt_map.copy()
+    pushes = pulls = 0
+    for m in moves:
+        before = dict(final.positions_of_boxes)
+        final.apply_move(m)
+        if final.positions_of_boxes != before:
+            if m in PULL_MOVES:
+                pulls += 1
+            else:
+                pushes += 1
+    return pushes, pulls, final.is_solved()
+
+
+def peak_rss_mb() -> float | None:
+    if not RESOURCE_AVAILABLE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_once(solver_key: str, map_path: str, seed: int, conn) -> None:
+    """
+    Process entry point: solves one map once and sends back the measurements.
+    """
+    random.seed(seed)
+    crt_map = load_map(map_path)
+    solver = solver_class(solver_key)(crt_map)
+    record = {}
+    start = time.perf_counter()
+    try:
+        moves = solver.solve()
+        record['status'] = 'solved' if moves is not None else 'failed'
+    except MemoryError:
+        moves, record['status'] = None, 'memory'
+    except Exception as e:
+        moves, record['status'] = None, f'error: {e}'
+    record['time'] = time.perf_counter() - start
+
+    stats = getattr(solver, 'stats', None)
+    record['nodes_expanded'] = stats.expanded if stats is not None else None
+    record['nodes_generated'] = stats.generated if stats is not None else None
+    if record['nodes_expanded'] is not None and record['time'] > 0:
+        record['nodes_per_sec'] = record['nodes_expanded'] / record['time']
+    record['peak_rss_mb'] = peak_rss_mb()
+    if moves is not None:
+        pushes, pulls, solved = count_box_moves(crt_map, moves)
+        record.update(moves=len(moves), pushes=pushes, pulls=pulls)
+        if not solved:
+            record['status'] = 'invalid'
+    conn.send(record)
+    conn.close()
+
+
+def run_benchmark(maps: list[str], solvers: list[str], timeout: float, repeats: int, seed: int) -> list[dict]:
+    """
+    Runs every solver on every map `repeats` times, each run in a fresh process so
+    that it can be killed at `timeout` seconds and its peak memory is its own.
+    """
+    runs = []
+    for map_path in maps:
+        map_name = ref_name(map_path)
+        for solver_key in solvers:
+            for repeat in range(repeats):
+                print(f'{map_name:20s} {SOLVERS[solver_key][0]:20s} run {repeat + 1}/{repeats} ... ',
+                      end='', flush=True)
+                parent, child = mp.Pipe(duplex=False)
+                # not a daemon: engines such as HDA* start worker processes of their own
+                proc = mp.Process(target=_run_once, args=(solver_key, map_path, seed + repeat, child))
+                started = time.perf_counter()
+                proc.start()
+                child.close()
+                if parent.poll(timeout):
+                    try:
+                        record = parent.recv()
+                    except EOFError:
+                        record = {'status': 'crashed', 'time': time.perf_counter() - started}
+                else:
+                    record = {'status': 'timeout', 'time': timeout}
+                proc.terminate()
+                proc.join()
+                if 'time' not in record:
+                    record['time'] = time.perf_counter() - started
+                record = {field: record.get(field) for field in RUN_FIELDS} | {
+                    'map': map_name, 'solver': SOLVERS[solver_key][0], 'repeat': repeat}
+                print(f"{record['status']} ({record['time']:.2f}s)")
+                runs.append(record)
+    return runs
+
+
+def measure_startup(repeats: int) -> list[dict]:
+    """
+    Times every STARTUP_SCENARIOS entry `repeats` times in a fresh interpreter run
+    with -X importtime. Reports the median wall time, the import time and module count
+    of the last run, its slowest imports, and which HEAVY_MODULES it loaded.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for name, code in STARTUP_SCENARIOS.items():
+        times = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=here,
+                                    capture_output=True, text=True)
+            times.append(time.perf_counter() - started)
+        # Lines read 'import time: self [us] | cumulative | imported package'
+        imports = []
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line and 'self [us]' not in line:
+                self_us, _, module = line[len('import time:'):].split('|')
+                imports.append((int(self_us), module.strip()))
+        loaded = {module.split('.')[0] for _, module in imports}
+        rows.append({
+            'scenario': name,
+            'status': 'ok' if result.returncode == 0 else f'error ({result.returncode})',
+            'time_median': statistics.median(times),
+            'import_time': sum(us for us, _ in imports) / 1e6,
+            'modules': len(imports),
+            'slowest': [module for _, module in sorted(imports, reverse=True)[:5]],
+            'heavy': sorted(m for m in HEAVY_MODULES if m in loaded),
+        })
+    return rows
+
+
+def compare_startup(rows: list[dict], baseline: list[dict], time_tolerance: float) -> list[str]:
+    """
+    Lists the startup scenarios that got slower than `baseline`, or started loading
+    heavy modules they did not load before.
+    """
+    base = {row['scenario']: row for row in baseline}
+    regressions = []
+    for row in rows:
+        old = base.get(row['scenario'])
+        if old is None:
+            continue
+        if (row['time_median'] > old['time_median'] * (1 + time_tolerance)
+                and row['time_median'] - old['time_median'] > STARTUP_NOISE):
+            regressions.append(f"{row['scenario']}: startup {1000 * row['time_median']:.1f} ms "
+                               f"vs {1000 * old['time_median']:.1f} ms")
+        new_heavy = sorted(set(row['heavy']) - set(old['heavy']))
+        if new_heavy:
+            regressions.append(f"{row['scenario']}: now loads {', '.join(new_heavy)}")
+    return regressions
+
+
+def summarize(runs: list[dict]) -> list[dict]:
+    """
+    One row per (map, solver): median and best time over the repeats, search effort
+    and solution size of the first solved run, and the worst peak memory.
+    """
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for run in runs:
+        groups.setdefault((run['map'], run['solver']), []).append(run)
+
+    summary = []
+    for (map_name, solver), group in groups.items():
+        solved = [r for r in group if r['status'] == 'solved']
+        times = [r['time'] for r in (solved or group)]
+        first = solved[0] if solved else group[0]
+        rates = [r['nodes_per_sec'] for r in solved if r['nodes_per_sec'] is not None]
+        rss = [r['peak_rss_mb'] for r in group if r['peak_rss_mb'] is not None]
+        summary.append({
+            'map': map_name,
+            'solver': solver,
+            'runs': len(group),
+            'solved': len(solved),
+            'status': 'solved' if len(solved) == len(group) else group[-1]['status'],
+            'time_median': statistics.median(times),
+            'time_min': min(times),
+            'nodes_expanded': first['nodes_expanded'],
+            'nodes_generated': first['nodes_generated'],
+            'nodes_per_sec': statistics.median(rates) if rates else None,
+            'peak_rss_mb': max(rss) if rss else None,
+            'moves': first['moves'],
+            'pushes': first['pushes'],
+            'pulls': first['pulls'],
+        })
+    return summary
+
+
+def compare(summary: list[dict], baseline: list[dict], time_tolerance: float, node_tolerance: float,
+            memory_tolerance: float, min_time: float) -> list[str]:
+    """
+    Lists the ways `summary` is worse than `baseline`, one message per regression.
+    Timing differences below `min_time` seconds are treated as noise.
+    """
+    base = {(row['map'], row['solver']): row for row in baseline}
+    regressions = []
+    for row in summary:
+        old = base.get((row['map'], row['solver']))
+        if old is None:
+            continue
+        name = f"{row['map']} / {row['solver']}"
+        if old['solved'] == old['runs'] and row['solved'] < row['runs']:
+            regressions.append(f"{name}: solved {row['solved']}/{row['runs']}, baseline solved every run")
+            continue
+        if row['solved'] == 0:
+            continue
+        if (row['time_median'] > old['time_median'] * (1 + time_tolerance)
+                and row['time_median'] - old['time_median'] > min_time):
+            regressions.append(f"{name}: median time {row['time_median']:.3f}s vs {old['time_median']:.3f}s")
+        if (row['nodes_expanded'] is not None and old['nodes_expanded'] is not None
+                and row['nodes_expanded'] > old['nodes_expanded'] * (1 + node_tolerance)):
+            regressions.append(f"{name}: {row['nodes_expanded']} nodes expanded vs {old['nodes_expanded']}")
+        if row['moves'] is not None and old['moves'] is not None and row['moves'] > old['moves']:
+            regressions.append(f"{name}: {row['moves']} moves vs {old['moves']}")
+        if (row['peak_rss_mb'] is not None and old['peak_rss_mb'] is not None
+                and row['peak_rss_mb'] > old['peak_rss_mb'] * (1 + memory_tolerance)):
+            regressions.append(f"{name}: peak RSS {row['peak_rss_mb']:.1f} MB vs {old['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the Sokoban solvers without the notebook.')
+    parser.add_argument('maps', nargs='*', help='map files or .lvls level sets (default: tests/*.yaml)')
+    parser.add_argument('--solvers', default=','.join(DEFAULT_SOLVERS),
+                        help=f"comma-separated subset of: {', '.join(SOLVERS)}")
+    parser.add_argument('--timeout', type=float, default=60.0, help='seconds per run (default: 60)')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per map and solver (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the first repeat (default: 0)')
+    parser.add_argument('--csv', help='write every run to this CSV file')
+    parser.add_argument('--json', help='write runs and summary to this JSON file (usable as a baseline)')
+    parser.add_argument('--baseline', help='JSON file from an earlier run to check for regressions')
+    parser.add_argument('--time-tolerance', type=float, default=0.2, help='allowed slowdown (default: 0.2)')
+    parser.add_argument('--node-tolerance', type=float, default=0.05, help='allowed extra nodes (default: 0.05)')
+    parser.add_argument('--memory-tolerance', type=float, default=0.2, help='allowed extra RSS (default: 0.2)')
+    parser.add_argument('--min-time', type=float, default=0.05, help='ignore time changes below this (default: 0.05s)')
+    parser.add_argument('--startup', action='store_true',
+                        help='time interpreter start-up and imports instead of solving (maps are ignored)')
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        return startup_main(args)
+
+    maps = [ref for path in args.maps for ref in level_refs(path)] or sorted(glob.glob('tests/*.yaml'))
+    solvers = [s.strip() for s in args.solvers.split(',') if s.strip()]
+    unknown = [s for s in solvers if s not in SOLVERS]
+    if unknown:
+        parser.error(f"unknown solver(s): {', '.join(unknown)}")
+    if not maps:
+        parser.error('no maps given and none found in tests/')
+
+    runs = run_benchmark(maps, solvers, args.timeout, args.repeats, args.seed)
+    summary = summarize(runs)
+
+    print()
+    def show(value, width: int, spec: str = 'd') -> str:
+        return format(value, f'>{width}{spec}') if value is not None else format('-', f'>{width}')
+
+    print(f"{'map':20s} {'solver':20s} {'solved':>6s} {'time':>8s} {'expanded':>10s} {'nodes/s':>9s} "
+          f"{'RSS MB':>7s} {'moves':>6s} {'pushes':>6s} {'pulls':>6s}")
+    for row in summary:
+        print(f"{row['map']:20s} {row['solver']:20s} {row['solved']:>3d}/{row['runs']:<2d} "
+              f"{row['time_median']:8.3f} {show(row['nodes_expanded'], 10)} "
+              f"{show(row['nodes_per_sec'], 9, '.0f')} {show(row['peak_rss_mb'], 7, '.1f')} "
+              f"{show(row['moves'], 6)} {show(row['pushes'], 6)} {show(row['pulls'], 6)}")
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RUN_FIELDS)
+            writer.writeheader()
+            writer.writerows(runs)
+    if args.json:
+        meta = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'timeout': args.timeout,
+            'repeats': args.repeats,
+            'seed': args.seed,
+        }
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'runs': runs, 'summary': summary}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['summary']
+        regressions = compare(summary, baseline, args.time_tolerance, args.node_tolerance,
+                              args.memory_tolerance, args.min_time)
+        print()
+        if regressions:
+            print(f'{len(regressions)} regression(s) against {args.baseline}:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print(f'No regressions against {args.baseline}.')
+    return 0
+
+
+def startup_main(args) -> int:
+    rows = measure_startup(args.repeats)
+    print(f"{'scenario':20s} {'status':10s} {'wall ms':>8s} {'import ms':>9s} {'modules':>7s}  heavy / slowest imports")
+    for row in rows:
+        print(f"{row['scenario']:20s} {row['status']:10s} {1000 * row['time_median']:8.1f} "
+              f"{1000 * row['import_time']:9.1f} {row['modules']:7d}  "
+              f"{', '.join(row['heavy']) or '-'} / {', '.join(row['slowest'])}")
+
+    if args.json:
+        meta = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeats': args.repeats,
+        }
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'startup': rows}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('startup', [])
+        regressions = compare_startup(rows, baseline, args.time_tolerance)
+        print()
+        if regressions:
+            print(f'{len(regressions)} regression(s) against {args.baseline}:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print(f'No regressions against {args.baseline}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
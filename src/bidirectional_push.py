@@ -0,0 +1,148 @@
+from .solver import Solver
+from .deadlock import DeadlockDetector, Pruner
+from .level import Level
+from .search_state import SearchState, expand_pushes
+from sokoban.map import Map
+
+
+class BidirectionalPushSolver(Solver):
+    """
+    Bidirectional breadth-first search over box pushes.
+    The forward side pushes boxes from the start position; the backward side starts
+    from the solved box layout, once per player region that could have made the last
+    push, and pulls boxes away from the targets. States on both sides are keyed on the
+    boxes plus the top-left cell of the player's region, so the two frontiers meet on
+    the same key. Each step grows the smaller frontier by one full layer, which keeps
+    the work near 2 * b^(d/2) pushed states instead of b^d.
+    The answer minimizes pushes and is expanded into full moves.
+    Forward pushes are checked by `pruner`, a DeadlockDetector unless another is given;
+    backward states can always reach the goal and need no check.
+    """
+
+    def __init__(self, map: Map, pruner: Pruner | None = None) -> None:
+        super().__init__(map)
+        self.level = Level(map)
+        self.pruner = pruner if pruner is not None else DeadlockDetector(self.level)
+
+    def _goal_states(self, state: SearchState) -> list[tuple[int, int, tuple[int, ...]]]:
+        """
+        Backward roots: boxes on every target, player at the top-left cell of each region
+        that touches a box (the player always ends next to the box it pushed last).
+        """
+        level = self.level
+        if len(level.targets) != len(state.boxes):
+            return []  # the solved layout is not unique; search forward only
+        boxes = tuple(level.targets)
+        goal = SearchState(level, state.player, boxes)
+        deltas = [d for _, d in level.push_moves]
+        seen = set()
+        roots = []
+        for box in boxes:
+            for d in deltas:
+                c = box + d
+                if level.walls[c] or c in goal.boxes or c in seen:
+                    continue
+                goal.load(c, boxes, level.zobrist.hash(c, boxes))
+                region = goal.reachable()
+                seen |= region
+                goal.normalize()
+                roots.append((goal.hash, goal.player, boxes))
+        return roots
+
+    def solve(self) -> list[int] | None:
+        level = self.level
+        walls = level.walls
+        dead = level.dead
+        push_moves = level.push_moves
+
+        start = SearchState.from_map(self.map, level)
+        state = start.copy()
+        if state.is_solved():
+            return []
+        state.normalize()
+
+        # key -> (depth, neighbour key towards the root, push linking the two)
+        fwd = {state.hash: (0, None, None)}
+        bwd = {}
+        fwd_layer = [(state.hash, state.player, tuple(state.boxes))]
+        bwd_layer = []
+        for key, player, boxes in self._goal_states(state):
+            if key not in bwd:
+                bwd[key] = (0, None, None)
+                bwd_layer.append((key, player, boxes))
+
+        best = None  # (total pushes, meeting key)
+        stats = self.new_stats()
+        progress_at = self.next_progress()
+        while fwd_layer and (bwd_layer or not bwd):
+            forward = not bwd_layer or len(fwd_layer) <= len(bwd_layer)
+            layer, seen, other = (fwd_layer, fwd, bwd) if forward else (bwd_layer, bwd, fwd)
+            next_layer = []
+            for key, player, boxes in layer:
+                depth = seen[key][0]
+                stats.expanded += 1
+                if stats.expanded >= progress_at:
+                    progress_at = self.report_progress()
+                state.load(player, boxes, key)
+                reachable = state.reachable()
+                for box in boxes:
+                    for move, d in push_moves:
+                        if forward:
+                            # push: player behind the box, free non-dead cell in front
+                            if box - d not in reachable or walls[box + d] or box + d in state.boxes or dead[box + d]:
+                                continue
+                            state.push(box, d)
+                            if self.pruner.is_deadlock(state, box + d):
+                                state.load(player, boxes, key)
+                                stats.pruned += 1
+                                continue
+                            link = (box, move)
+                        else:
+                            # pull: player in front of the box with room to step back
+                            if box + d not in reachable or walls[box + 2 * d] or box + 2 * d in state.boxes:
+                                continue
+                            state.pull(box, d)
+                            # the forward push undoing this pull moves the box from box + d by -d
+                            link = (box + d, next(m for m, od in push_moves if od == -d))
+                        state.normalize()
+                        child = state.hash
+                        if child in seen:
+                            stats.duplicates += 1
+                        else:
+                            stats.generated += 1
+                            seen[child] = (depth + 1, key, link)
+                            next_layer.append((child, state.player, tuple(state.boxes)))
+                            if forward and not bwd and state.is_solved():
+                                best = (depth + 1, child) if best is None or depth + 1 < best[0] else best
+                            if child in other:
+                                total = depth + 1 + other[child][0]
+                                if best is None or total < best[0]:
+                                    best = (total, child)
+                        state.load(player, boxes, key)
+            if len(next_layer) > stats.max_open:
+                stats.max_open = len(next_layer)
+            if best is not None:
+                return expand_pushes(start, self._pushes(fwd, bwd, best[1]))
+            if forward:
+                fwd_layer = next_layer
+            else:
+                bwd_layer = next_layer
+        return None
+
+    def _pushes(self, fwd: dict, bwd: dict, meet: int) -> list[tuple[int, int]]:
+        """
+        Joins the forward chain from the start to `meet` with the backward chain from
+        `meet` to the goal into one list of (box cell, push move) pairs.
+        """
+        pushes = []
+        key = meet
+        while fwd[key][1] is not None:
+            _, key, link = fwd[key]
+            pushes.append(link)
+        pushes.reverse()
+        key = meet
+        while key in bwd and bwd[key][1] is not None:
+            _, parent, link = bwd[key]
+            pushes.append(link)
+            key = parent
+        return pushes
@@ -0,0 +1,228 @@
+from .level import Level, UNREACHABLE
+from .search_state import SearchState
+from collections import OrderedDict, deque
+
+
+class Pruner:
+    """
+    Pruning interface shared by the solvers: is_deadlock() is asked about every
+    generated state, right after the push that created it, and True drops the state
+    before it is queued. `moved` is the cell the pushed box landed on, or None to
+    check the whole state. The base class prunes nothing.
+    """
+
+    def is_deadlock(self, state: SearchState, moved: int | None = None) -> bool:
+        return False
+
+
+class DeadlockDetector(Pruner):
+    """
+    Deadlock tests for push-only search, cheapest first:
+    - dead squares: no target can be reached from the box by pushing;
+    - freeze: the box is blocked along both axes by walls, dead squares or other
+      frozen boxes, and some box frozen with it is off target;
+    - bipartite: boxes cannot be matched to distinct targets they can reach;
+    - PI-corral: the pushed box closes an area the player cannot enter, every push of
+      its fence goes inwards, and a small push search on the fence boxes alone finds
+      no way to open it or fill its targets.
+    Freeze results are cached on the box pattern around the pushed box, corral results
+    on the fence boxes and player region; both caches evict least recently used entries.
+    """
+
+    def __init__(self, level: Level, cache_size: int = 100_000, corral_nodes: int = 256, window: int = 2) -> None:
+        self.level = level
+        self.cache_size = cache_size
+        self.corral_nodes = corral_nodes
+        self.axes = (1, level.stride)
+        self.deltas = [d for _, d in level.push_moves]
+        # Offsets of the square window whose boxes key the freeze cache
+        self.window = [dx * level.stride + dy for dx in range(-window, window + 1) for dy in range(-window, window + 1)]
+        self.window_set = frozenset(self.window)
+        # Targets a lone box can still be pushed to, per cell
+        self.reachable_targets = [
+            tuple(t for t, dist in level.push_dist.items() if dist[c] < UNREACHABLE)
+            for c in range(level.size)
+        ]
+        self.freeze_cache = OrderedDict()
+        self.corral_cache = OrderedDict()
+
+    def is_deadlock(self, state: SearchState, moved: int | None = None) -> bool:
+        boxes = state.boxes
+        dead = self.level.dead
+        cells = list(boxes) if moved is None else [moved]
+        for box in cells:
+            if dead[box]:
+                return True
+        for box in cells:
+            if self.frozen(box, boxes):
+                return True
+        if not self.matchable(boxes):
+            return True
+        return moved is not None and self.corral(state, moved)
+
+    def _remember(self, cache: OrderedDict, key, value: bool) -> bool:
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def frozen(self, box: int, boxes) -> bool:
+        """
+        Freeze deadlock test around `box`.
+        """
+        mask = 0
+        for i, off in enumerate(self.window):
+            if box + off in boxes:
+                mask |= 1 << i
+        key = (box, mask)
+        cached = self.freeze_cache.get(key)
+        if cached is not None:
+            self.freeze_cache.move_to_end(key)
+            return cached
+
+        inspected = set()
+        stuck = []
+        deadlock = self._freeze(box, boxes, set(), inspected, stuck) and any(
+            b not in self.level.targets for b in stuck)
+        # Only cache results that never looked at a box outside the window
+        window = self.window_set
+        if all(c - box in window for c in inspected):
+            self._remember(self.freeze_cache, key, deadlock)
+        return deadlock
+
+    def _freeze(self, box: int, boxes, walled: set, inspected: set, stuck: list) -> bool:
+        """
+        True if `box` can move along neither axis; boxes in `walled` count as walls.
+        Appends every box found frozen on the way to `stuck`.
+        """
+        walls = self.level.walls
+        dead = self.level.dead
+        found = len(stuck)
+        walled.add(box)
+        for d in self.axes:
+            a, b = box - d, box + d
+            inspected.add(a)
+            inspected.add(b)
+            if walls[a] or walls[b] or a in walled or b in walled:
+                continue
+            if dead[a] and dead[b]:
+                continue
+            if any(n in boxes and self._freeze(n, boxes, walled, inspected, stuck) for n in (a, b)):
+                continue
+            walled.discard(box)
+            del stuck[found:]  # boxes frozen only against this one are not frozen after all
+            return False
+        stuck.append(box)
+        return True
+
+    def matchable(self, boxes) -> bool:
+        """
+        Whether every box can be given its own target among those it can reach
+        (Kuhn's augmenting paths).
+        """
+        reachable_targets = self.reachable_targets
+        owner = {}
+
+        def assign(box: int, seen: set) -> bool:
+            for t in reachable_targets[box]:
+                if t in seen:
+                    continue
+                seen.add(t)
+                if t not in owner or assign(owner[t], seen):
+                    owner[t] = box
+                    return True
+            return False
+
+        return all(assign(box, set()) for box in boxes)
+
+    def corral(self, state: SearchState, moved: int) -> bool:
+        """
+        PI-corral deadlock test for the area the push into `moved` may have closed off.
+        """
+        level = self.level
+        walls = level.walls
+        boxes = state.boxes
+        region = self._region(state.player, boxes)
+        seen = set()
+        for d in self.deltas:
+            start = moved + d
+            if walls[start] or start in boxes or start in region or start in seen:
+                continue
+            area = self._region(start, boxes)
+            seen |= area
+            fence = {b for c in area for b in (c + e for e in self.deltas) if b in boxes}
+            if self._closed_corral(area, fence, region, boxes):
+                key = (tuple(sorted(fence)), min(area), min(self._region(state.player, fence)))
+                cached = self.corral_cache.get(key)
+                if cached is None:
+                    cached = self._remember(self.corral_cache, key, not self._opens(area, fence, state.player))
+                else:
+                    self.corral_cache.move_to_end(key)
+                if cached:
+                    return True
+        return False
+
+    def _region(self, start: int, boxes) -> set[int]:
+        neighbours = self.level.neighbours
+        region = {start}
+        stack = [start]
+        while stack:
+            c = stack.pop()
+            for n in neighbours[c]:
+                if n not in region and n not in boxes:
+                    region.add(n)
+                    stack.append(n)
+        return region
+
+    def _closed_corral(self, area: set, fence: set, region: set, boxes) -> bool:
+        """
+        PI condition: the player touches every fence box, and every push it can make
+        on them moves a box into the corral. Corrals with nothing left to do are skipped.
+        """
+        targets = self.level.targets
+        if all(b in targets for b in fence) and not any(c in targets for c in area):
+            return False
+        walls = self.level.walls
+        for b in fence:
+            if not any(b + d in region for d in self.deltas):
+                return False
+            for d in self.deltas:
+                if b - d in region and not walls[b + d] and b + d not in boxes and b + d not in area:
+                    return False
+        return True
+
+    def _opens(self, area: set, fence: set, player: int) -> bool:
+        """
+        Breadth-first push search with only the fence boxes on the board, bounded by
+        `corral_nodes`. True if the player gets into the corral, the fence boxes all
+        end on targets, or the bound is hit.
+        """
+        level = self.level
+        walls = level.walls
+        dead = level.dead
+        targets = level.targets
+        start = (frozenset(fence), min(self._region(player, fence)))
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            if len(seen) > self.corral_nodes:
+                return True  # undecided, keep the state
+            boxes, player = queue.popleft()
+            region = self._region(player, boxes)
+            if not region.isdisjoint(area):
+                return True
+            if boxes <= targets:
+                return True
+            for b in boxes:
+                for d in self.deltas:
+                    n = b + d
+                    if b - d not in region or walls[n] or n in boxes or dead[n]:
+                        continue
+                    pushed = (boxes - {b}) | {n}
+                    if self.frozen(n, pushed):
+                        continue
+                    node = (pushed, min(self._region(b, pushed)))
+                    if node not in seen:
+                        seen.add(node)
+                        queue.append(node)
+        return False
@@ -0,0 +1,175 @@
+from .a_star import AStarSolver
+from .deadlock import Pruner
+from .search_state import SearchState
+from sokoban.map import Map
+import heapq
+import math
+import multiprocessing as mp
+import os
+
+
+def _hda_worker(wid: int, solver: 'HDAStarSolver', inboxes: list, control, reports) -> None:
+    """
+    Process entry point of one HDA* worker.
+    Owns every state whose hash maps to `wid`: keeps its open list and best-g table,
+    expands its cheapest nodes when told to, ships children to their owners in one
+    batch per owner, and absorbs the batches sent to it.
+    """
+    n = len(inboxes)
+    state = SearchState.from_map(solver.map, solver.level)
+    open_heap = []
+    best_g = {}
+    entry_count = 0
+
+    while True:
+        cmd = control.get()
+
+        if cmd[0] == 'stop':
+            return
+
+        if cmd[0] == 'expand':
+            incumbent = cmd[1]
+            outgoing = [[] for _ in range(n)]
+            goal = None
+            expanded = 0
+            generated = 0
+            pruned = 0
+            while open_heap and expanded < solver.batch_size:
+                f, g, _, key, player, boxes, path = open_heap[0]
+                # Nothing at or above the best known solution can improve it
+                if f >= incumbent:
+                    break
+                heapq.heappop(open_heap)
+                if best_g.get(key, g) < g:
+                    continue  # stale entry
+                state.load(player, boxes, key)
+                if state.is_solved():
+                    incumbent = g
+                    goal = (g, path)
+                    continue
+                expanded += 1
+                for move in state.legal_moves():
+                    box_from = state.do_move(move)
+                    if solver.pruned(state, move, box_from):
+                        state.undo_move(move, box_from)
+                        pruned += 1
+                        continue
+                    child_boxes = boxes if box_from < 0 else tuple(state.boxes)
+                    outgoing[state.hash % n].append((g + 1, state.hash, state.player, child_boxes, path + bytes((move,))))
+                    state.undo_move(move, box_from)
+                    generated += 1
+
+            sent = [0] * n
+            for owner, batch in enumerate(outgoing):
+                if batch:
+                    inboxes[owner].put(batch)
+                    sent[owner] = 1
+            reports.put((wid, sent, goal, expanded, generated, pruned))
+
+        elif cmd[0] == 'absorb':
+            duplicates = 0
+            for _ in range(cmd[1]):
+                for g, key, player, boxes, path in inboxes[wid].get():
+                    if key in best_g and best_g[key] <= g:
+                        duplicates += 1
+                        continue
+                    best_g[key] = g
+                    state.load(player, boxes, key)
+                    h = solver.heuristic(state)
+                    heapq.heappush(open_heap, (g + h, g, entry_count, key, player, boxes, path))
+                    entry_count += 1
+            # Report the smallest f still queued so the coordinator can detect termination
+            while open_heap and best_g.get(open_heap[0][3], open_heap[0][1]) < open_heap[0][1]:
+                heapq.heappop(open_heap)
+            reports.put((wid, open_heap[0][0] if open_heap else math.inf, duplicates, len(open_heap)))
+
+
+class HDAStarSolver(AStarSolver):
+    """
+    Hash-distributed A* (HDA*) over several worker processes.
+    Each state is owned by the worker `hash % workers`, which alone keeps it in its open
+    list and best-g table. Work proceeds in synchronous rounds: every worker expands up
+    to `batch_size` of its best nodes and sends the children to their owners in batched
+    queues, then every worker absorbs what it was sent. The search stops once no worker
+    holds a node with f below the best solution found. The inherited heuristic, the
+    walk-distance matching, never overestimates even with pulls, so the move count is
+    optimal unless a `pruner` cuts off every shortest path.
+    """
+
+    def __init__(
+        self,
+        map: Map,
+        workers: int | None = None,
+        batch_size: int = 256,
+        pruner: Pruner | None = None
+    ) -> None:
+        super().__init__(map, pruner=pruner)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    def solve(self) -> list[int] | None:
+        """
+        Runs HDA* search.
+        Returns a list of moves (as integers), or None if no solution is found.
+        """
+        n = self.workers
+        inboxes = [mp.Queue() for _ in range(n)]
+        controls = [mp.Queue() for _ in range(n)]
+        reports = mp.Queue()
+        procs = [mp.Process(target=_hda_worker, args=(wid, self, inboxes, controls[wid], reports), daemon=True)
+                 for wid in range(n)]
+        for p in procs:
+            p.start()
+
+        stats = self.new_stats()
+        progress_at = self.next_progress()
+
+        def absorb(expected: list[int]) -> float:
+            for wid in range(n):
+                controls[wid].put(('absorb', expected[wid]))
+            min_f = math.inf
+            queued = 0
+            for _ in range(n):
+                _, worker_min_f, duplicates, open_size = reports.get()
+                min_f = min(min_f, worker_min_f)
+                stats.duplicates += duplicates
+                queued += open_size
+            stats.max_open = max(stats.max_open, queued)
+            return min_f
+
+        try:
+            # Seed the owner of the root with the start state
+            start = SearchState.from_map(self.map, self.level)
+            owner = start.hash % n
+            inboxes[owner].put([(0, start.hash, start.player, tuple(start.boxes), b'')])
+            expected = [0] * n
+            expected[owner] = 1
+            min_f = absorb(expected)
+
+            incumbent = math.inf
+            best_path = None
+            while min_f < incumbent:
+                for wid in range(n):
+                    controls[wid].put(('expand', incumbent))
+                expected = [0] * n
+                for _ in range(n):
+                    _, sent, goal, expanded, generated, pruned = reports.get()
+                    stats.expanded += expanded
+                    stats.generated += generated
+                    stats.pruned += pruned
+                    for owner in range(n):
+                        expected[owner] += sent[owner]
+                    if goal is not None and goal[0] < incumbent:
+                        incumbent, best_path = goal
+                min_f = absorb(expected)
+                if stats.expanded >= progress_at:
+                    progress_at = self.report_progress()
+
+            return list(best_path) if best_path is not None else None
+        finally:
+            for wid in range(n):
+                controls[wid].put(('stop',))
+            for p in procs:
+                p.join(timeout=1)
+                if p.is_alive():
+                    p.terminate()
@@ -1,4 +1,9 @@
 from .solver import Solver
+from .assignment import assignment_heuristic
+from .deadlock import Pruner
+from .level import Level
+from .search_state import SearchState
+from .transposition import TranspositionTable
 from sokoban.map import Map
 from sokoban.moves import *
 import math
@@ -6,84 +11,174 @@ import math
 
 class IDAStarSolver(Solver):
     """
-    IDA* solver using Manhattan-distance heuristic for boxes.
+    IDA* solver using the AStarSolver heuristic: a matching of boxes to distinct targets.
     Iterative Deepening A* combines the memory efficiency of DFS
     with the heuristic guidance of A* by performing depth-limited searches
     using a cost threshold.
+    A bounded transposition table survives between iterations, so states reached
+    more cheaply before are skipped and subtrees shown to overshoot an earlier bound
+    are cut straight away instead of being searched again.
+    An optional `pruner` cuts moves whose moved box it reports dead, as in AStarSolver.
     """
 
-    def heuristic(self, state: Map) -> int:
+    def __init__(
+        self,
+        map: Map,
+        tt_entries: int = 1_000_000,
+        tt_bytes: int | None = None,
+        pruner: Pruner | None = None
+    ) -> None:
+        super().__init__(map)
+        # Walk-distance tables, computed once per level
+        self.level = Level(map)
+        self.tt_entries = tt_entries
+        self.tt_bytes = tt_bytes
+        self.pruner = pruner
+
+    def heuristic(self, state: SearchState) -> int:
         """
-        Heuristic function estimating cost from current state to goal.
-        Computes the sum of minimum Manhattan distances from each box
-        to the nearest target. Admissible and consistent in grid-based maps.
+        Cost of the cheapest matching of boxes to distinct targets, where each
+        box -> target edge is the walk distance around walls, as in AStarSolver.
+        Admissible and consistent with pulls, and never below the sum of per-box
+        nearest-target distances it replaces.
         """
-        total = 0
-        for (box_x, box_y) in state.positions_of_boxes:
-            dmin = math.inf
-            for (tx, ty) in state.targets:
-                d = abs(box_x - tx) + abs(box_y - ty)
-                if d < dmin:
-                    dmin = d
-            total += dmin
-        return total
+        return assignment_heuristic(self.level, state.boxes, self.level.walk_dist)
 
     def solve(self) -> list[int] | None:
         """
         Performs the IDA* search, returning a list of moves if a solution is found.
         If no solution exists, returns None.
         """
-        start = self.map.copy()
-        bound = self.heuristic(start)  # initial threshold based on heuristic
-        start_key = str(start)
-
-        def dfs(state: Map, g: int, bound: int, visited: set[str]) -> tuple[bool | int, list[int] | None]:
-            """
-            Recursive depth-first search with cost-bound pruning.
-            Returns:
-                - (True, path) if goal is found
-                - (next_threshold, None) if current path exceeds bound
-            """
-            f = g + self.heuristic(state)
-            if f > bound:
-                return f, None  # cut off this branch
-            if state.is_solved():
-                return True, []  # goal reached
-
-            min_t = math.inf  # minimum cost encountered above current bound
-
-            for move in state.filter_possible_moves():
-                nxt = state.copy()
-                nxt.apply_move(move)
-                key = str(nxt)
-
-                if key in visited:
-                    continue  # avoid cycles
-
-                visited.add(key)
-                t, path = dfs(nxt, g + 1, bound, visited)
-                visited.remove(key)
-
-                if t is True:
-                    return True, [move] + path  # propagate solution path
-
-                if isinstance(t, int) and t < min_t:
-                    min_t = t  # update next threshold for next iteration
-
-            return min_t, None
+        state = SearchState.from_map(self.map, self.level)
+        bound = self.heuristic(state)  # initial threshold based on heuristic
+        table = TranspositionTable(self.tt_entries, self.tt_bytes)
+        self.new_stats()  # search effort over all iterations
 
         # Iteratively deepen the search with increasing threshold
         while True:
-            visited = {start_key}
-            t, path = dfs(start, 0, bound, visited)
-
-            if t is True:
-                return path  # solution found
+            self.stats.bound = bound
+            t, path = self.bounded_search(state, bound, table)
 
             if path is not None:
-                return path  # defensive, should be redundant
+                return path  # solution found
 
             if t == math.inf:
                 return None  # no more nodes to explore
 
             bound = t  # increase threshold for next iteration
+
+    def bounded_search(self, state: SearchState, bound: int, table: TranspositionTable) -> tuple[float, list[int] | None]:
+        """
+        One depth-first pass with cost-bound pruning, driven by an explicit stack instead
+        of recursion, so solution depth is not limited by the interpreter's recursion limit.
+        Each depth keeps its state key, heuristic, legal moves, next move index, smallest
+        f seen above the bound, and the move (with its undo record) that led one level down.
+        Walks the single shared `state`, applying and undoing moves in place.
+        Returns:
+            - (bound, path) if goal is found
+            - (next_threshold, None) if every path exceeds bound
+        """
+        stats = self.stats
+        # Phase-timed when instrumented, otherwise the plain functions
+        heuristic = self.timed('heuristic', self.heuristic)
+        legal_moves = self.timed('successors', SearchState.legal_moves)
+        lookup = self.timed('table', table.get)
+        is_deadlock = self.timed('deadlocks', self.pruner.is_deadlock) if self.pruner is not None else None
+        deltas = self.level.deltas
+        progress_at = self.next_progress()
+
+        key = state.hash
+        h = heuristic(state)
+        entry = lookup(key)
+        if entry is not None:
+            h = max(h, entry[1])
+        if h > bound:
+            return h, None
+        if state.is_solved():
+            return bound, []
+
+        # One slot per depth; the columns double whenever the search goes deeper
+        keys = [key]
+        hs = [h]
+        options = [legal_moves(state)]
+        stats.expanded += 1
+        if h < stats.best_h:
+            stats.best_h = h
+        next_index = [0]
+        min_t = [math.inf]  # minimum cost encountered above current bound
+        path = [0]
+        undo = [0]
+        columns = (keys, hs, options, next_index, min_t, path, undo)
+        visited = {key}
+        depth = 0
+
+        while True:
+            moves = options[depth]
+            i = next_index[depth]
+            if i < len(moves):
+                next_index[depth] = i + 1
+                move = moves[i]
+                box_from = state.do_move(move)
+                key = state.hash
+
+                if key in visited:
+                    state.undo_move(move, box_from)
+                    stats.duplicates += 1
+                    continue  # avoid cycles
+
+                stats.generated += 1
+                if box_from >= 0 and is_deadlock is not None and is_deadlock(state, box_from + deltas[move]):
+                    state.undo_move(move, box_from)
+                    stats.pruned += 1
+                    continue  # moved box is stuck for good
+
+                g = depth + 1
+                h = heuristic(state)
+                entry = lookup(key)
+                if entry is not None:
+                    if entry[0] < g:
+                        state.undo_move(move, box_from)
+                        stats.duplicates += 1
+                        continue  # reached more cheaply elsewhere
+                    if entry[1] > h:
+                        h = entry[1]  # bound learned by an earlier search of this state
+                f = g + h
+                if f > bound:
+                    state.undo_move(move, box_from)
+                    if f < min_t[depth]:
+                        min_t[depth] = f  # update next threshold for next iteration
+                    continue  # cut off this branch
+
+                path[depth] = move
+                if state.is_solved():
+                    return bound, path[:g]  # goal reached
+
+                undo[depth] = box_from
+                if g == len(keys):
+                    for column in columns:
+                        column.extend(column)
+                keys[g] = key
+                hs[g] = h
+                options[g] = legal_moves(state)
+                stats.expanded += 1
+                if h < stats.best_h:
+                    stats.best_h = h
+                if stats.expanded >= progress_at:
+                    progress_at = self.report_progress()
+                next_index[g] = 0
+                min_t[g] = math.inf
+                visited.add(key)
+                depth = g
+                if depth > stats.max_open:
+                    stats.max_open = depth  # the open list of a depth-first search is its path
+            else:
+                # Every child is done: nothing below min_t leads to the goal from here at this g
+                t = min_t[depth]
+                table.store(keys[depth], depth, t - depth if t != math.inf else hs[depth])
+                visited.remove(keys[depth])
+                if depth == 0:
+                    return t, None
+                depth -= 1
+                state.undo_move(path[depth], undo[depth])
+                if t < min_t[depth]:
+                    min_t[depth] = t
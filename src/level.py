@@ -0,0 +1,111 @@
+from .transitions import MOVE_DELTAS, PULL_MOVES
+from .zobrist import ZobristHasher
+from sokoban.map import Map, OBSTACLE_SYMBOL
+from sokoban.moves import LEFT, RIGHT, UP, DOWN
+from collections import deque
+
+# Distance stored for cells from which a box can never reach a target
+UNREACHABLE = 10**6
+
+
+class Level:
+    """
+    Immutable part of a Sokoban map (walls and targets), shared by every search state.
+    Cells are flat indices into a grid padded with one ring of walls, so moving
+    in any direction is an integer offset and never needs a bounds check.
+    """
+
+    def __init__(self, state: Map) -> None:
+        self.length = state.length
+        self.width = state.width
+        self.stride = state.width + 2
+        self.size = (state.length + 2) * self.stride
+
+        self.walls = bytearray(b'\x01') * self.size
+        for x in range(state.length):
+            for y in range(state.width):
+                if state.map[x][y] != OBSTACLE_SYMBOL:
+                    self.walls[self.cell(x, y)] = 0
+
+        self.targets = frozenset(self.cell(tx, ty) for (tx, ty) in state.targets)
+        self.is_target = bytearray(self.size)
+        for t in self.targets:
+            self.is_target[t] = 1
+
+        # Flat offset of every move code, plus the four plain moves used to push boxes
+        self.deltas = {move: dx * self.stride + dy for move, (dx, dy) in MOVE_DELTAS.items()}
+        self.pulls = PULL_MOVES
+        self.push_moves = [(move, self.deltas[move]) for move in (LEFT, RIGHT, UP, DOWN)]
+
+        self.zobrist = ZobristHasher(self.size)
+
+        # Walkable neighbours of every floor cell, for flood fills
+        offsets = [d for _, d in self.push_moves]
+        self.neighbours = [
+            () if self.walls[c] else tuple(c + d for d in offsets if not self.walls[c + d])
+            for c in range(self.size)
+        ]
+
+        # Static tables, computed once per level so heuristics become lookups
+        self.push_dist = {t: self._pull_distances(t) for t in self.targets}
+        self.min_push = [min((dist[c] for dist in self.push_dist.values()), default=UNREACHABLE)
+                         for c in range(self.size)]
+        self.dead = bytearray(self.size)
+        for c in range(self.size):
+            if not self.walls[c] and self.min_push[c] >= UNREACHABLE:
+                self.dead[c] = 1
+        # Per-target walks, for matchings that must stay admissible when boxes can be pulled
+        self.walk_dist = {t: self._walk_distances((t,)) for t in self.targets}
+
+    def cell(self, x: int, y: int) -> int:
+        """
+        Flat index of map coordinate (x, y).
+        """
+        return (x + 1) * self.stride + y + 1
+
+    def coords(self, cell: int) -> tuple[int, int]:
+        """
+        Map coordinate (x, y) of a flat index.
+        """
+        x, y = divmod(cell, self.stride)
+        return x - 1, y - 1
+
+    def _pull_distances(self, target: int) -> list[int]:
+        """
+        Minimum number of pushes needed to bring a lone box from every cell to `target`,
+        found by pulling the box backwards from the target. A push by offset d from c
+        needs c - d and c + d free, so c is a predecessor of c + d under that condition.
+        """
+        walls = self.walls
+        deltas = [d for _, d in self.push_moves]
+        dist = [UNREACHABLE] * self.size
+        dist[target] = 0
+        dq = deque([target])
+        while dq:
+            b = dq.popleft()
+            for d in deltas:
+                c = b - d
+                if not walls[c] and not walls[c - d] and dist[c] == UNREACHABLE:
+                    dist[c] = dist[b] + 1
+                    dq.append(c)
+        return dist
+
+    def _walk_distances(self, sources) -> list[int]:
+        """
+        Shortest walk from every cell to the nearest of `sources` around walls,
+        a lower bound on the moves of a box whether it is pushed or pulled.
+        """
+        walls = self.walls
+        deltas = [d for _, d in self.push_moves]
+        dist = [UNREACHABLE] * self.size
+        dq = deque(sources)
+        for t in sources:
+            dist[t] = 0
+        while dq:
+            c = dq.popleft()
+            for d in deltas:
+                n = c + d
+                if not walls[n] and dist[n] == UNREACHABLE:
+                    dist[n] = dist[c] + 1
+                    dq.append(n)
+        return dist
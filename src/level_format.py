@@ -0,0 +1,218 @@
+from sokoban.map import Map, OBSTACLE_SYMBOL
+import mmap
+import os
+import struct
+
+# Level record: length, width, player cell, box count, target count, name length (bytes),
+# then the name (UTF-8), the wall bitmap and the box and target cells as uint16.
+# A cell is x * width + y (unlike Level's cells, with no wall border); bit i of the bitmap
+# is cell i, low bit first.
+RECORD_HEADER = struct.Struct('<6H')
+# Level set: magic, format version, level count, then count + 1 absolute uint64 offsets
+# (the last one is the end of the file) and the records back to back
+SET_MAGIC = b'SKLV'
+SET_VERSION = 1
+SET_HEADER = struct.Struct('<4sHxxI')
+SET_EXTENSION = '.lvls'
+
+# Solution byte: (run length - 1) in the high nibble, move code in the low nibble
+MAX_RUN = 16
+
+
+def pack_level(state: Map, name: str | None = None) -> bytes:
+    """
+    Binary record of a level; `name` defaults to the map's test name.
+    """
+    length, width = state.length, state.width
+    if length * width > 0xFFFF:
+        raise ValueError(f'level of {length}x{width} cells does not fit uint16 cell indexes')
+    if name is None:
+        name = getattr(state, 'test_name', None) or ''
+    encoded = name.encode()
+
+    walls = bytearray((length * width + 7) // 8)
+    for x in range(length):
+        row = state.map[x]
+        for y in range(width):
+            if row[y] == OBSTACLE_SYMBOL:
+                i = x * width + y
+                walls[i >> 3] |= 1 << (i & 7)
+    boxes = sorted(bx * width + by for (bx, by) in state.positions_of_boxes)
+    targets = sorted(tx * width + ty for (tx, ty) in state.targets)
+    return b''.join((
+        RECORD_HEADER.pack(length, width, state.player.x * width + state.player.y,
+                           len(boxes), len(targets), len(encoded)),
+        encoded,
+        bytes(walls),
+        struct.pack(f'<{len(boxes)}H', *boxes),
+        struct.pack(f'<{len(targets)}H', *targets),
+    ))
+
+
+def unpack_level(buffer, offset: int = 0) -> Map:
+    """
+    Map of the record starting at `offset` in `buffer` (bytes, or an mmap).
+    Boxes are named box0, box1, ... in cell order.
+    """
+    length, width, player, box_count, target_count, name_length = RECORD_HEADER.unpack_from(buffer, offset)
+    offset += RECORD_HEADER.size
+    name = bytes(buffer[offset:offset + name_length]).decode()
+    offset += name_length
+
+    walls_size = (length * width + 7) // 8
+    obstacles = []
+    for j, byte in enumerate(buffer[offset:offset + walls_size]):
+        while byte:
+            low = byte & -byte
+            i = (j << 3) + low.bit_length() - 1
+            obstacles.append(divmod(i, width))
+            byte ^= low
+    offset += walls_size
+    boxes = struct.unpack_from(f'<{box_count}H', buffer, offset)
+    offset += 2 * box_count
+    targets = struct.unpack_from(f'<{target_count}H', buffer, offset)
+
+    px, py = divmod(player, width)
+    return Map(length, width, px, py,
+               [(f'box{k}', *divmod(c, width)) for k, c in enumerate(boxes)],
+               [divmod(c, width) for c in targets],
+               obstacles, name or None)
+
+
+def write_level_set(path: str, maps) -> int:
+    """
+    Writes the maps (or (name, map) pairs) to a level-set file. Returns how many.
+    """
+    records = []
+    for item in maps:
+        name, state = item if isinstance(item, tuple) else (None, item)
+        records.append(pack_level(state, name))
+    offsets = []
+    position = SET_HEADER.size + 8 * (len(records) + 1)
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    offsets.append(position)
+    with open(path, 'wb') as f:
+        f.write(SET_HEADER.pack(SET_MAGIC, SET_VERSION, len(records)))
+        f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        f.writelines(records)
+    return len(records)
+
+
+class LevelSet:
+    """
+    Read-only, memory-mapped level-set file. Any level is decoded on its own in O(1)
+    through the offset table, so opening a large set reads nothing but the header.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = SET_HEADER.unpack_from(self.buffer, 0)
+        if magic != SET_MAGIC or version != SET_VERSION:
+            self.buffer.close()
+            raise ValueError(f'{path} is not a version {SET_VERSION} level set')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def offset(self, index: int) -> int:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f'level {index} out of range for {self.count} levels')
+        return struct.unpack_from('<Q', self.buffer, SET_HEADER.size + 8 * index)[0]
+
+    def __getitem__(self, index: int) -> Map:
+        return unpack_level(self.buffer, self.offset(index))
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def name(self, index: int) -> str:
+        """
+        Stored name of a level, without decoding the rest of it.
+        """
+        offset = self.offset(index)
+        name_length = RECORD_HEADER.unpack_from(self.buffer, offset)[5]
+        start = offset + RECORD_HEADER.size
+        return bytes(self.buffer[start:start + name_length]).decode()
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def __enter__(self) -> 'LevelSet':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def encode_moves(moves: list[int]) -> bytes:
+    """
+    Run-length encodes a solution, one byte per run of up to MAX_RUN equal moves.
+    """
+    out = bytearray()
+    i = 0
+    while i < len(moves):
+        move = moves[i]
+        if not 0 <= move < 16:
+            raise ValueError(f'move code {move} does not fit a nibble')
+        run = 1
+        while run < MAX_RUN and i + run < len(moves) and moves[i + run] == move:
+            run += 1
+        out.append((run - 1) << 4 | move)
+        i += run
+    return bytes(out)
+
+
+def decode_moves(data: bytes) -> list[int]:
+    moves = []
+    for byte in data:
+        moves.extend([byte & 0x0F] * ((byte >> 4) + 1))
+    return moves
+
+
+def split_ref(ref: str) -> tuple[str, int | None]:
+    """
+    Splits a level reference, 'set.lvls#3' for one level of a set or a plain map path,
+    into the path and the index (None for a plain path).
+    """
+    path, sep, index = ref.rpartition('#')
+    if sep and path.endswith(SET_EXTENSION) and index.isdigit():
+        return path, int(index)
+    return ref, None
+
+
+def level_refs(path: str) -> list[str]:
+    """
+    One reference per level: every level of a set, or the path itself.
+    """
+    if path.endswith(SET_EXTENSION):
+        with LevelSet(path) as levels:
+            return [f'{path}#{i}' for i in range(len(levels))]
+    return [path]
+
+
+def load_map(ref: str) -> Map:
+    """
+    Map of a level reference; only plain paths go through YAML.
+    """
+    path, index = split_ref(ref)
+    if index is None:
+        return Map.from_yaml(path)
+    with LevelSet(path) as levels:
+        return levels[index]
+
+
+def ref_name(ref: str) -> str:
+    """
+    Short display name of a level reference: the file name without its extension,
+    with '#index' for a level of a set.
+    """
+    path, index = split_ref(ref)
+    base = os.path.splitext(os.path.basename(path))[0]
+    return base if index is None else f'{base}#{index}'
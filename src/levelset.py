@@ -0,0 +1,45 @@
+import argparse
+import sys
+import time
+from registry import use_headless_sokoban
+
+# Nothing here plots: sokoban is loaded without its matplotlib/PIL imports, unless already loaded
+use_headless_sokoban()
+from search_methods.level_format import LevelSet, write_level_set
+from batch import collect_jobs
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Convert Sokoban levels to and from the binary level-set format.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help='write levels to a .lvls level set')
+    pack.add_argument('output', help='level-set file to write')
+    pack.add_argument('sources', nargs='+',
+                      help="map files, directories of *.yaml, glob patterns, level sets, or '-' for level strings on stdin")
+    unpack = commands.add_parser('unpack', help='print levels as Map.from_str strings, separated by blank lines')
+    unpack.add_argument('input', help='level-set file')
+    unpack.add_argument('indexes', nargs='*', type=int, help='levels to print (default: all)')
+    info = commands.add_parser('info', help='list the levels of a set')
+    info.add_argument('input', help='level-set file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        started = time.perf_counter()
+        count = write_level_set(args.output, collect_jobs(args.sources))
+        print(f'{count} levels written to {args.output} in {time.perf_counter() - started:.2f}s', file=sys.stderr)
+        return 0
+
+    with LevelSet(args.input) as levels:
+        if args.command == 'unpack':
+            indexes = args.indexes or range(len(levels))
+            print('\n\n'.join(str(levels[i]) for i in indexes))
+        else:
+            for i in range(len(levels)):
+                crt_map = levels[i]
+                print(f'{i:6d}  {levels.name(i) or "-":24s} {crt_map.length}x{crt_map.width}, '
+                      f'{len(crt_map.positions_of_boxes)} boxes')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
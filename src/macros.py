@@ -0,0 +1,209 @@
+from .level import Level
+from collections import deque
+
+# Larger areas behind an entrance are not treated as goal rooms, to bound the set-up search
+MAX_ROOM_CELLS = 64
+
+# Values of the push solvers' `macros` argument: none, tunnels only, tunnels and goal rooms
+MACRO_MODES = (None, 'tunnels', 'rooms')
+
+
+class MacroMoves:
+    """
+    Macro pushes for push-level search, found once per level:
+    - tunnels (always): a box pushed along a corridor one cell wide, with the player in the
+      corridor behind it, can do nothing but go on, so the pushes to the far end
+      become one edge (stopping on targets, dead squares and room entrances);
+    - goal rooms (with goal_rooms=True): an area holding targets and no boxes at the start, cut off from the
+      rest by a single entrance cell. Its targets get a fill order in which every box
+      can still be pushed in from the entrance, and a box pushed onto the entrance
+      while the room holds exactly the first k targets of that order is taken straight
+      to target k+1 along a precomputed push path.
+    Macro edges cost their real number of pushes. A tunnel push leaves nothing else
+    worth doing, so tunnel macros keep push counts optimal; goal-room macros keep every
+    solvable level solvable in practice but can, rarely, cost a few extra pushes over
+    the optimum, which is why they are opt-in.
+    """
+
+    def __init__(self, level: Level, boxes, goal_rooms: bool = False) -> None:
+        self.level = level
+        walls = level.walls
+        self.move_of = {d: move for move, d in level.push_moves}
+        # tunnel[i][c]: a box on c pushed along the i-th direction sits in a one-cell corridor,
+        # and so does the player behind it
+        self.tunnel = []
+        for _, d in level.push_moves:
+            side = level.stride if abs(d) == 1 else 1
+            flags = bytearray(level.size)
+            for c in range(level.size):
+                if walls[c] or c in level.targets:
+                    continue
+                p = c - d
+                if walls[c + side] and walls[c - side] and not walls[p] and walls[p + side] and walls[p - side]:
+                    flags[c] = 1
+            self.tunnel.append(flags)
+        self.direction = {d: i for i, (_, d) in enumerate(level.push_moves)}
+        # (entrance, push offset into the room) -> (room cells, fill order, push paths per step)
+        self.rooms = {}
+        if goal_rooms:
+            self._find_rooms(set(boxes))
+        # starts[d][c]: a push by d onto c may begin a macro; solvers test it before follow()
+        self.starts = {}
+        for i, (_, d) in enumerate(level.push_moves):
+            flags = bytearray(self.tunnel[i])
+            for entrance, e in self.rooms:
+                if e == d:
+                    flags[entrance] = 1
+            self.starts[d] = flags
+
+    def follow(self, boxes, cell: int, d: int) -> list[tuple[int, int, int]]:
+        """
+        Pushes forced after a box was pushed by `d` onto `cell`, as (box cell, move,
+        offset) triples in order; empty when the push is not the start of a macro.
+        `boxes` is the box set after that first push and is not changed.
+        """
+        walls = self.level.walls
+        dead = self.level.dead
+        tunnel = self.tunnel[self.direction[d]]
+        pushes = []
+        while tunnel[cell] and (cell, d) not in self.rooms:
+            n = cell + d
+            if walls[n] or dead[n] or n in boxes:
+                break
+            pushes.append((cell, self.move_of[d], d))
+            cell = n
+        room = self.rooms.get((cell, d))
+        if room is not None:
+            area, order, paths = room
+            inside = [b for b in boxes if b in area]
+            k = len(inside)
+            if k < len(order) and all(b in order[:k] for b in inside):
+                pushes.extend((b, self.move_of[e], e) for b, e in paths[k])
+        return pushes
+
+    def _find_rooms(self, boxes: set) -> None:
+        level = self.level
+        walls = level.walls
+        neighbours = level.neighbours
+        for entrance in range(level.size):
+            if walls[entrance] or entrance in level.targets:
+                continue
+            # A side of the entrance reached through exactly one neighbour, and not from the
+            # cell opposite it, is a room that boxes can only be pushed into straight on
+            for start in neighbours[entrance]:
+                d = start - entrance
+                if walls[entrance - d]:
+                    continue  # no cell to push from outside the room
+                area = self._region(start, entrance)
+                if len(area) > MAX_ROOM_CELLS or sum(n in area for n in neighbours[entrance]) > 1:
+                    continue
+                targets = [c for c in area if c in level.targets]
+                if not targets or area & boxes:
+                    continue
+                plan = self._fill_plan(area, entrance, d, targets)
+                if plan is not None:
+                    self.rooms[(entrance, d)] = (frozenset(area),) + plan
+        # In a corridor leading into a room every corridor cell is an entrance; keep the
+        # innermost one, tunnel macros bring boxes that far
+        for entrance, d in list(self.rooms):
+            if (entrance + d, d) in self.rooms:
+                del self.rooms[(entrance, d)]
+
+    def _region(self, start: int, blocked: int) -> set[int]:
+        """
+        Floor cells connected to `start` without passing `blocked`, stopping early once
+        there are more than MAX_ROOM_CELLS of them.
+        """
+        neighbours = self.level.neighbours
+        region = {start}
+        stack = [start]
+        while stack and len(region) <= MAX_ROOM_CELLS:
+            c = stack.pop()
+            for n in neighbours[c]:
+                if n != blocked and n not in region:
+                    region.add(n)
+                    stack.append(n)
+        return region
+
+    def _fill_plan(self, area: set, entrance: int, d: int, targets: list[int]):
+        """
+        Fill order of the room's targets and the push path into each one, found backwards:
+        with every target filled, the target filled last is one whose box can be pushed
+        in from the entrance past the others, leaving the player a way out.
+        Returns (order, paths) or None when the room cannot be filled this way.
+        """
+        remaining = set(targets)
+        order = []
+        paths = []
+        while remaining:
+            # Prefer the nearest target as the last to fill, so the room fills from the back
+            for t in sorted(remaining, key=lambda c: self._distance(area, entrance, c)):
+                path = self._push_path(area, entrance, d, t, remaining - {t})
+                if path is not None:
+                    break
+            else:
+                return None
+            remaining.discard(t)
+            order.append(t)
+            paths.append(path)
+        order.reverse()
+        paths.reverse()
+        return tuple(order), paths
+
+    def _distance(self, area: set, entrance: int, goal: int) -> int:
+        dist = {entrance: 0}
+        dq = deque([entrance])
+        while dq:
+            c = dq.popleft()
+            if c == goal:
+                return dist[c]
+            for n in self.level.neighbours[c]:
+                if n in area and n not in dist:
+                    dist[n] = dist[c] + 1
+                    dq.append(n)
+        return 0
+
+    def _push_path(self, area: set, entrance: int, d: int, goal: int, others: set):
+        """
+        Shortest list of (box cell, offset) pushes taking a box from the entrance, with
+        the player just outside it, to `goal` inside the room without moving `others`.
+        The player must still be able to walk out of the entrance afterwards.
+        """
+        level = self.level
+        walls = level.walls
+        outside = entrance - d
+        allowed = area | {entrance}
+
+        def region(player: int, box: int) -> set[int]:
+            cells = {player}
+            stack = [player]
+            while stack:
+                c = stack.pop()
+                for n in level.neighbours[c]:
+                    if n not in cells and n != box and n not in others and (n in allowed or n == outside):
+                        cells.add(n)
+                        stack.append(n)
+            return cells
+
+        start = (entrance, min(region(outside, entrance)))
+        parent = {start: None}
+        dq = deque([start])
+        while dq:
+            box, player = node = dq.popleft()
+            reach = region(player, box)
+            if box == goal and outside in reach:
+                path = []
+                while parent[node] is not None:
+                    node, push = parent[node]
+                    path.append(push)
+                path.reverse()
+                return path
+            for _, e in level.push_moves:
+                n = box + e
+                if box - e not in reach or walls[n] or n not in area or n in others or level.dead[n]:
+                    continue
+                child = (n, min(region(box, n)))
+                if child not in parent:
+                    parent[child] = (node, (box, e))
+                    dq.append(child)
+        return None
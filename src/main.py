@@ -1,73 +1,79 @@
 import sys
 import time
-from sokoban import Box, DOWN, Map, Player
-from sokoban.moves import moves_meaning
-from search_methods.ida_star import IDAStarSolver
-from search_methods.simulated_annealing import SimulatedAnnealingSolver
-from search_methods.a_star import AStarSolver
-from search_methods.push_a_star import PushAStarSolver
-from search_methods.push_idastar import PushIDAStarSolver
+from registry import SOLVERS, resolve, solver_class, use_headless_sokoban
+
+# Solver for a map given without one, by the first of these words in its path
+DEFAULT_SOLVERS = [('easy', 'ida'), ('medium', 'astar'), ('hard', 'push-ida'), ('large', 'astar')]
 
 
 if __name__ == '__main__':
-    # Parse command-line arguments
-    if len(sys.argv) >= 3:
-        alg_arg = sys.argv[1].lower()
-        map_path = sys.argv[2]
-    elif len(sys.argv) == 2:
+    # Batch mode: python3 main.py --batch <maps, directories, globs or -> [options]
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        use_headless_sokoban()
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
+    # Parse command-line arguments; --stats times the search phases and reports progress,
+    # --profile runs the search under the sampling profiler
+    show_stats = '--stats' in sys.argv
+    profile = '--profile' in sys.argv
+    args = [a for a in sys.argv if a not in ('--stats', '--profile')]
+    if len(args) >= 3:
+        alg_arg = args[1].lower()
+        map_path = args[2]
+    elif len(args) == 2:
         alg_arg = None
-        map_path = sys.argv[1]
+        map_path = args[1]
     else:
         alg_arg = None
         map_path = 'tests/easy_map2.yaml'
 
+    # Choose solver; only its own module gets imported
+    if alg_arg is None:
+        key = next((k for word, k in DEFAULT_SOLVERS if word in map_path), 'ida')
+    else:
+        key = resolve(alg_arg)
+        if key is None:
+            print(f"Unknown algorithm: {alg_arg}")
+            print(f"Available: {', '.join(SOLVERS)}")
+            sys.exit(1)
+
+    # Nothing here plots, so sokoban is loaded without its matplotlib/PIL imports
+    use_headless_sokoban()
+    from sokoban.map import Map
+    from sokoban.moves import moves_meaning
+
     print(f"Loading map from: {map_path}")
     crt_map = Map.from_yaml(map_path)
     print("\nInitial Map:")
     print(crt_map)
 
-    # Choose solver
-    if alg_arg in ('ida*', 'ida', 'ida-star', 'ida_star'):
-        solver = IDAStarSolver(crt_map)
-        alg_name = "IDA*"
-    elif alg_arg in ('simulated-annealing', 'simanneal', 'annealing'):
-        solver = SimulatedAnnealingSolver(crt_map)
-        alg_name = "Simulated Annealing"
-    elif alg_arg is None:
-        if 'easy' in map_path:
-            solver = IDAStarSolver(crt_map)
-            alg_name = "IDA*"
-        elif 'medium' in map_path:
-            solver = AStarSolver(crt_map)
-            alg_name = "A*"
-        elif 'hard' in map_path:
-            solver = PushIDAStarSolver(crt_map)
-            alg_name = "Push-IDA*"
-        elif 'large' in map_path or 'super_hard' in map_path:
-            solver = AStarSolver(crt_map)
-            alg_name = "A*"
-        else:
-            solver = IDAStarSolver(crt_map)
-            alg_name = "IDA*"
-    else:
-        print(f"Unknown algorithm: {alg_arg}")
-        sys.exit(1)
+    options = {}
+    if key == 'ara':
+        # First solution fast, then improved until optimal or out of time
+        def report(moves, weight, bound):
+            print(f"  {len(moves)} moves (weight {weight:g}, within {bound:.2f}x of optimal)")
+        options = {'deadline': 60, 'callback': report}
+    solver = solver_class(key)(crt_map, **options)
+    alg_name = SOLVERS[key][0]
 
     # Run solver with timing
     print(f"\nRunning {alg_name} solver...")
+    if show_stats:
+        solver.instrument(timers=True, progress=lambda stats: print(f"  {stats.expanded} expanded, {stats.max_open} open"))
     start_time = time.time()
     try:
-        moves = solver.solve()
+        moves = solver.profile('sample') if profile else solver.solve()
     except KeyboardInterrupt:
         print("Search interrupted. Falling back to Simulated Annealing.")
-        solver = SimulatedAnnealingSolver(crt_map)
+        solver = solver_class('simanneal')(crt_map)
         moves = solver.solve()
         alg_name = "Simulated Annealing (fallback)"
     elapsed_time = time.time() - start_time
 
     if moves is None:
-        print("No solution found with Push-IDA*. Falling back to A*.")
-        solver = AStarSolver(crt_map)
+        print(f"No solution found with {alg_name}. Falling back to A*.")
+        solver = solver_class('astar')(crt_map)
         alg_name = "A* (fallback)"
         start_time = time.time()
         moves = solver.solve()
@@ -78,7 +84,12 @@ if __name__ == '__main__':
 
     # Output solution
     print(f"\nAlgorithm used: {alg_name}")
+    if hasattr(solver, 'winner'):
+        print(f"Winning engine: {solver.winner}")
+        for entry in solver.report:
+            print(f"  {entry['engine']}: {entry['status']} ({entry['time']:.2f}s)")
     print(f"Execution time: {elapsed_time:.2f} seconds")
+    print(f"Search: {solver.stats}")
     print(f"Number of moves: {len(moves)}")
     print("Solution moves:", [moves_meaning[m] for m in moves])
 
@@ -0,0 +1,199 @@
+from .level import Level, UNREACHABLE
+from .reachability import Reachability
+from array import array
+from collections import deque
+from itertools import combinations
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+# Bump whenever the file layout or the build changes, so stale caches are ignored
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHI4x')
+MAGIC = b'SPDB'
+# Table value of box placements from which the pattern's targets cannot be reached
+UNSOLVED = 0xFFFF
+
+
+def default_cache_dir() -> str:
+    return os.environ.get('SOKOBAN_PDB_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'sokoban_pdb'))
+
+
+class PatternDatabase:
+    """
+    Pattern-database heuristic: exact push costs for every placement of
+    `pattern_size` boxes on the level with all other boxes removed.
+    The table is built by a breadth-first retrograde search that pulls boxes away
+    from every choice of targets, and keeps for each placement the fewest pushes over
+    all player positions. A full state is scored by splitting its boxes into groups
+    (combine='add': disjoint groups of neighbouring boxes, costs summed) or by taking
+    the worst group (combine='max': every group, costs maximised). Both are admissible
+    for push counts only: a box on a push-dead square scores UNREACHABLE, and pulls
+    are not modelled, so the table is wired into the push solvers and never into the
+    move-level ones (A*, IDA*, ARA*), where pulls are legal.
+    Tables are saved under `cache_dir`, named by a hash of the walls and targets, and
+    memory-mapped on later runs of the same level instead of being rebuilt.
+    """
+
+    def __init__(
+        self,
+        level: Level,
+        pattern_size: int = 2,
+        combine: str = 'add',
+        cache_dir: str | None = None
+    ) -> None:
+        if combine not in ('add', 'max'):
+            raise ValueError(f'unknown combine mode: {combine}')
+        self.level = level
+        self.k = max(1, min(pattern_size, len(level.targets)))
+        self.combine = combine
+
+        # Boxes only ever stand on live cells, which are numbered densely for indexing
+        self.floor = [c for c in range(level.size) if not level.walls[c] and not level.dead[c]]
+        self.floor_id = [-1] * level.size
+        for i, c in enumerate(self.floor):
+            self.floor_id[c] = i
+
+        self.path = os.path.join(cache_dir or default_cache_dir(), f'{self.layout_hash()}.pdb')
+        self.table = self._load()
+        if self.table is None:
+            self.table = self._build()
+            self._save()
+
+    def layout_hash(self) -> str:
+        """
+        Cache key: everything the table depends on, and nothing else.
+        """
+        level = self.level
+        digest = hashlib.sha1()
+        digest.update(f'{FORMAT_VERSION}:{sys.byteorder}:{self.k}:{level.length}x{level.width}:'.encode())
+        digest.update(bytes(level.walls))
+        digest.update(repr(sorted(level.targets)).encode())
+        return digest.hexdigest()
+
+    def index(self, cells) -> int:
+        """
+        Table slot of a group of box cells, given in increasing order.
+        """
+        n = len(self.floor)
+        floor_id = self.floor_id
+        i = 0
+        for c in cells:
+            i = i * n + floor_id[c]
+        return i
+
+    def value(self, boxes) -> int:
+        """
+        Lower bound on the pushes needed to solve a state with these box cells.
+        """
+        floor_id = self.floor_id
+        cells = sorted(boxes)
+        for c in cells:
+            if floor_id[c] < 0:
+                return UNREACHABLE  # box on a dead square
+        k = self.k
+        table = self.table
+
+        if self.combine == 'max':
+            best = 0
+            for group in combinations(cells, k):
+                v = table[self.index(group)]
+                if v == UNSOLVED:
+                    return UNREACHABLE
+                if v > best:
+                    best = v
+            return best
+
+        total = 0
+        full = len(cells) - len(cells) % k
+        for i in range(0, full, k):
+            v = table[self.index(cells[i:i + k])]
+            if v == UNSOLVED:
+                return UNREACHABLE
+            total += v
+        # Boxes left over after the last full group count on their own
+        min_push = self.level.min_push
+        for c in cells[full:]:
+            total += min_push[c]
+        return total
+
+    def _build(self) -> array:
+        """
+        Retrograde breadth-first search over placements of k boxes plus the player's
+        region (keyed on its top-left cell), pulling one box per step.
+        """
+        level = self.level
+        walls = level.walls
+        deltas = [d for _, d in level.push_moves]
+        flood = Reachability(level)
+        table = array('H', [UNSOLVED]) * (len(self.floor) ** self.k)
+
+        seen = set()
+        queue = deque()
+        for group in combinations(sorted(level.targets), self.k):
+            table[self.index(group)] = 0
+            # the last push leaves the player next to one of the boxes
+            for box in group:
+                for d in deltas:
+                    c = box + d
+                    if walls[c] or c in group:
+                        continue
+                    node = (group, flood.top_left(c, group))
+                    if node not in seen:
+                        seen.add(node)
+                        queue.append((group, node[1], 0))
+
+        while queue:
+            boxes, player, dist = queue.popleft()
+            flood.fill(player, boxes)
+            reachable = flood.contains
+            for box in boxes:
+                for d in deltas:
+                    # pull: player in front of the box with room to step back
+                    if not reachable(box + d) or walls[box + 2 * d] or box + 2 * d in boxes:
+                        continue
+                    moved = tuple(sorted(box + d if b == box else b for b in boxes))
+                    node = (moved, flood.top_left(box + 2 * d, moved))
+                    if node in seen:
+                        continue
+                    seen.add(node)
+                    i = self.index(moved)
+                    if table[i] == UNSOLVED:
+                        table[i] = min(dist + 1, UNSOLVED - 1)
+                    queue.append((moved, node[1], dist + 1))
+        return table
+
+    def _load(self) -> memoryview | None:
+        """
+        Maps a cached table into memory, or returns None if there is no usable one.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mapped) < HEADER.size:
+            return None
+        magic, version, k, floor = HEADER.unpack_from(mapped)
+        expected = HEADER.size + 2 * len(self.floor) ** self.k
+        if (magic, version, k, floor) != (MAGIC, FORMAT_VERSION, self.k, len(self.floor)) or len(mapped) != expected:
+            return None
+        return memoryview(mapped)[HEADER.size:].cast('H')
+
+    def _save(self) -> None:
+        """
+        Writes the table next to other cached levels; a failure only costs the cache.
+        """
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.k, len(self.floor)))
+                self.table.tofile(f)
+            # atomic, so a concurrent run never maps a half-written file
+            os.replace(tmp, self.path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
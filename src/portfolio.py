@@ -0,0 +1,187 @@
+from .solver import Solver, SolveCancelled
+from .a_star import AStarSolver
+from .push_a_star import PushAStarSolver
+from .ida_star import IDAStarSolver
+from .simulated_annealing import SimulatedAnnealingSolver
+from sokoban.map import Map
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # not available on Windows
+    RESOURCE_AVAILABLE = False
+
+# Expansions between an engine's checks of its stop flag
+STOP_CHECK_INTERVAL = 1_000
+# Seconds an engine is given to notice its stop flag before it is terminated
+STOP_GRACE = 2.0
+
+
+def default_engines(sa_seeds: tuple[int, ...] = (0, 1, 2, 3)) -> list[tuple]:
+    """
+    The standard portfolio: every exact engine once plus a few annealing seeds.
+    Each entry is (name, solver class, constructor kwargs, random seed), optionally
+    followed by the engine's own time limit and memory limit in MB; a missing or None
+    limit falls back to the portfolio's.
+    """
+    engines = [
+        ('A*', AStarSolver, {}, None),
+        ('Push-A*', PushAStarSolver, {}, None),
+        ('IDA*', IDAStarSolver, {}, None),
+    ]
+    for seed in sa_seeds:
+        engines.append((f'SimAnneal (seed {seed})', SimulatedAnnealingSolver, {}, seed))
+    return engines
+
+
+def _run_engine(name: str, solver_cls: type, kwargs: dict, seed: int | None, crt_map: Map,
+                time_limit: float | None, memory_limit_mb: int | None, stop_flag, results: mp.Queue) -> None:
+    """
+    Process entry point: runs one engine and reports (name, status, moves, seconds).
+    The solver checks `stop_flag` and its time limit at its progress checkpoints and
+    winds down by itself, so the process is not killed while it may be writing to
+    `results`.
+    """
+    if memory_limit_mb is not None and RESOURCE_AVAILABLE:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if seed is not None:
+        random.seed(seed)
+
+    start = time.time()
+
+    def stop() -> str | None:
+        if stop_flag.is_set():
+            return 'cancelled'
+        if time_limit is not None and time.time() - start > time_limit:
+            return 'timeout'
+        return None
+
+    try:
+        moves = solver_cls(crt_map, **kwargs).cancellable(stop, STOP_CHECK_INTERVAL).solve()
+        status = 'solved' if moves is not None else 'failed'
+    except SolveCancelled as e:
+        moves, status = None, e.reason
+    except MemoryError:
+        moves, status = None, 'memory'
+    except Exception as e:
+        moves, status = None, f'error: {e}'
+    results.put((name, status, moves, time.time() - start))
+
+
+class PortfolioSolver(Solver):
+    """
+    Runs several solvers in parallel processes and keeps the first verified solution.
+    Engines are started up to `workers` at a time, each under its own time limit and
+    (on Unix) address-space limit, taken from its engine entry or else from
+    `time_limit` and `memory_limit_mb`. As soon as one returns moves that really solve
+    the map, every other engine is asked to stop at its next checkpoint, and only
+    terminated if it has not within STOP_GRACE seconds. After solve(), `winner` names
+    the engine that won and `report` lists what happened to each engine.
+    """
+
+    def __init__(
+        self,
+        map: Map,
+        engines: list[tuple] | None = None,
+        workers: int | None = None,
+        time_limit: float | None = None,
+        memory_limit_mb: int | None = None
+    ) -> None:
+        super().__init__(map)
+        self.engines = engines if engines is not None else default_engines()
+        self.workers = workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.memory_limit_mb = memory_limit_mb
+        self.winner: str | None = None
+        self.report: list[dict] = []
+
+    def verify(self, moves: list[int]) -> bool:
+        """
+        Replays `moves` on a copy of the map and checks that it ends solved.
+        """
+        final = self.map.copy()
+        try:
+            for m in moves:
+                final.apply_move(m)
+        except ValueError:
+            return False
+        return final.is_solved()
+
+    def solve(self) -> list[int] | None:
+        self.winner = None
+        self.report = []
+        results = mp.Queue()
+        pending = list(self.engines)
+        running = {}  # name -> (process, start time, time limit, stop flag)
+
+        def launch() -> None:
+            while pending and len(running) < self.workers:
+                name, solver_cls, kwargs, seed, *limits = pending.pop(0)
+                time_limit, memory_limit_mb = (*limits, None, None)[:2]
+                if time_limit is None:
+                    time_limit = self.time_limit
+                if memory_limit_mb is None:
+                    memory_limit_mb = self.memory_limit_mb
+                stop_flag = mp.Event()
+                proc = mp.Process(
+                    target=_run_engine,
+                    args=(name, solver_cls, kwargs, seed, self.map, time_limit, memory_limit_mb,
+                          stop_flag, results),
+                    daemon=True
+                )
+                proc.start()
+                running[name] = (proc, time.time(), time_limit, stop_flag)
+
+        def stop(names: list[str], status: str) -> None:
+            # Raise every flag first so the engines wind down together
+            for name in names:
+                running[name][3].set()
+            deadline = time.time() + STOP_GRACE
+            for name in names:
+                proc, started, _, _ = running.pop(name)
+                proc.join(max(0.0, deadline - time.time()))
+                if proc.is_alive():
+                    # Stuck between checkpoints: the last resort
+                    proc.terminate()
+                    proc.join()
+                self.report.append({'engine': name, 'status': status, 'time': time.time() - started})
+
+        launch()
+        try:
+            while running:
+                try:
+                    name, status, moves, elapsed = results.get(timeout=0.1)
+                except queue.Empty:
+                    # Engines stop themselves at their time limit; this catches those that
+                    # overran it between checkpoints, and those that died silently
+                    now = time.time()
+                    for name, (proc, started, time_limit, _) in list(running.items()):
+                        if time_limit is not None and now - started > time_limit + STOP_GRACE:
+                            stop([name], 'timeout')
+                        elif not proc.is_alive() and proc.exitcode != 0:
+                            stop([name], f'crashed ({proc.exitcode})')
+                    launch()
+                    continue
+
+                if name not in running:
+                    continue  # already stopped and reported, its result arrived late
+                if status == 'solved' and not self.verify(moves):
+                    status = 'invalid'
+                proc = running.pop(name)[0]
+                proc.join()
+                self.report.append({'engine': name, 'status': status, 'time': elapsed})
+
+                if status == 'solved':
+                    self.winner = name
+                    return moves
+                launch()
+        finally:
+            # Cancel everything still running once a winner is known (or on interrupt)
+            stop(list(running), 'cancelled')
+        return None
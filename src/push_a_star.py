@@ -1,127 +1,138 @@
 from .solver import Solver
-from sokoban.map import Map, OBSTACLE_SYMBOL, TARGET_SYMBOL
-from sokoban.moves import LEFT, RIGHT, UP, DOWN, BOX_LEFT, BOX_RIGHT, BOX_UP, BOX_DOWN
+from .assignment import assignment_heuristic
+from .batch_heuristic import BatchHeuristic, NUMPY_AVAILABLE
+from .deadlock import DeadlockDetector, Pruner
+from .level import Level
+from .macros import MacroMoves, MACRO_MODES
+from .pattern_database import PatternDatabase
+from .reachability import Reachability
+from .search_state import SearchState, expand_pushes
+from sokoban.map import Map
 import heapq
-import math
-from collections import deque
-
-try:
-    from munkres import Munkres
-    MUNKRES_AVAILABLE = True
-except ImportError:
-    MUNKRES_AVAILABLE = False
 
 class PushAStarSolver(Solver):
     """
     A* solver over box-pushes: each action is pushing a box, player moves are computed implicitly.
+    batch=True scores all pushes of an expansion with one vectorized BatchHeuristic call.
+    pattern_size=k adds a k-box PatternDatabase bound, taking the larger estimate.
+    Pushed states are checked by `pruner`, a DeadlockDetector unless another is given.
+    `macros` chains forced pushes into one edge costing their number of pushes (see
+    MacroMoves): 'tunnels' (the default) chains pushes along one-cell corridors and keeps
+    push counts optimal, 'rooms' also fills goal rooms in a fixed order, which can cost
+    a few extra pushes, and None turns macros off.
     """
-    def heuristic(self, state: Map) -> int:
-        if MUNKRES_AVAILABLE:
-            # optimal assignment of boxes to targets
-            boxes = list(state.positions_of_boxes.keys())
-            targets = list(state.targets)
-            matrix = [[abs(bx-tx) + abs(by-ty) for tx,ty in targets] for bx,by in boxes]
-            m = Munkres()
-            cost = 0
-            for r, c in m.compute(matrix):
-                cost += matrix[r][c]
-            return cost
-        # fallback: sum of minimal Manhattan distances
-        total = 0
-        for (bx, by) in state.positions_of_boxes:
-            dmin = math.inf
-            for (tx, ty) in state.targets:
-                d = abs(bx - tx) + abs(by - ty)
-                if d < dmin:
-                    dmin = d
-            total += dmin
-        return total
+    def __init__(
+        self,
+        map: Map,
+        batch: bool = False,
+        pattern_size: int | None = None,
+        pruner: Pruner | None = None,
+        macros: str | None = 'tunnels'
+    ) -> None:
+        super().__init__(map)
+        # Dead-square table and push-distance matrix are precomputed once here
+        self.level = Level(map)
+        self.batch_heuristic = BatchHeuristic(self.level) if batch and NUMPY_AVAILABLE else None
+        self.pdb = PatternDatabase(self.level, pattern_size) if pattern_size else None
+        self.pruner = pruner if pruner is not None else DeadlockDetector(self.level)
+        boxes = [self.level.cell(bx, by) for (bx, by) in map.positions_of_boxes]
+        if macros not in MACRO_MODES:
+            raise ValueError(f'macros must be one of {MACRO_MODES}, not {macros!r}')
+        self.macros = MacroMoves(self.level, boxes, goal_rooms=macros == 'rooms') if macros else None
+
+    def heuristic(self, state: SearchState) -> int:
+        # optimal assignment of boxes to targets on push distances
+        h = assignment_heuristic(self.level, state.boxes)
+        if self.pdb is not None:
+            h = max(h, self.pdb.value(state.boxes))
+        return h
 
-    def is_deadlock(self, state: Map) -> bool:
-        # simple corner deadlock: any non-target box in a static corner
-        for (bx, by) in state.positions_of_boxes:
-            if (bx, by) in state.targets:
-                continue
-            up = bx-1 < 0 or state.map[bx-1][by] == OBSTACLE_SYMBOL
-            down = bx+1 >= state.length or state.map[bx+1][by] == OBSTACLE_SYMBOL
-            left = by-1 < 0 or state.map[bx][by-1] == OBSTACLE_SYMBOL
-            right = by+1 >= state.width or state.map[bx][by+1] == OBSTACLE_SYMBOL
-            # corner
-            if (up and left) or (up and right) or (down and left) or (down and right):
-                return True
-            # freeze deadlock: two boxes along a wall with obstacles on one side
-            # horizontal pair
-            if (bx, by+1) in state.positions_of_boxes:
-                # obstacles above both
-                if (bx-1 < 0 or (state.map[bx-1][by] == OBSTACLE_SYMBOL and state.map[bx-1][by+1] == OBSTACLE_SYMBOL)):
-                    return True
-                # obstacles below both
-                if (bx+1 >= state.length or (state.map[bx+1][by] == OBSTACLE_SYMBOL and state.map[bx+1][by+1] == OBSTACLE_SYMBOL)):
-                    return True
-            # vertical pair
-            if (bx+1, by) in state.positions_of_boxes:
-                # obstacles left of both
-                if (by-1 < 0 or (state.map[bx][by-1] == OBSTACLE_SYMBOL and state.map[bx+1][by-1] == OBSTACLE_SYMBOL)):
-                    return True
-                # obstacles right of both
-                if (by+1 >= state.width or (state.map[bx][by+1] == OBSTACLE_SYMBOL and state.map[bx+1][by+1] == OBSTACLE_SYMBOL)):
-                    return True
-        return False
+    def is_deadlock(self, state: SearchState, moved: int | None = None) -> bool:
+        # dead squares, freeze, bipartite and corral deadlocks, see DeadlockDetector
+        return self.pruner.is_deadlock(state, moved)
 
     def solve(self) -> list[int] | None:
-        start = self.map.copy()
-        start_key = (tuple(sorted(start.positions_of_boxes.keys())), (start.player.x, start.player.y))
+        start = SearchState.from_map(self.map, self.level)
+        state = start.copy()
+        walls = state.level.walls
+        push_moves = state.level.push_moves
+        flood = Reachability(self.level)
+        # states are keyed with the player on the top-left cell of its region
+        state.move_player(flood.top_left(state.player, state.boxes))
         open_heap = []
-        heapq.heappush(open_heap, (self.heuristic(start), 0, start, []))
-        best_g = {start_key: 0}
+        entry_count = 0  # tie-breaker so states are never compared directly
+        heapq.heappush(open_heap, (self.heuristic(state), 0, entry_count, state.hash, state.player, tuple(state.boxes), []))
+        entry_count += 1
+        best_g = {state.hash: 0}
+        stats = self.new_stats()
+        # Phase-timed when instrumented, otherwise the plain functions
+        heappush = self.timed('heap', heapq.heappush)
+        heappop = self.timed('heap', heapq.heappop)
+        fill = self.timed('successors', flood.fill)
+        do_push = self.timed('successors', SearchState.push)
+        undo_push = self.timed('successors', SearchState.unpush)
+        heuristic = self.timed('heuristic', self.heuristic)
+        batch_heuristic = self.timed('heuristic', self.batch_heuristic) if self.batch_heuristic else None
+        is_deadlock = self.timed('deadlocks', self.is_deadlock)
+        follow = self.macros.follow if self.macros is not None else None
+        starts = self.macros.starts if self.macros is not None else None
+        progress_at = self.next_progress()
 
         while open_heap:
-            f, g, state, path = heapq.heappop(open_heap)
+            f, g, _, key, player, boxes, path = heappop(open_heap)
+            state.load(player, boxes, key)
             if state.is_solved():
-                return path
-            # compute reachable cells for player ignoring boxes
-            reachable = set()
-            dq = deque()
-            dq.append((state.player.x, state.player.y))
-            reachable.add((state.player.x, state.player.y))
-            while dq:
-                x, y = dq.popleft()
-                for move, dx, dy in [(LEFT,0,-1),(RIGHT,0,1),(UP,1,0),(DOWN,-1,0)]:
-                    nx, ny = x + dx, y + dy
-                    # bounds & obstacle & box check
-                    if 0 <= nx < state.length and 0 <= ny < state.width:
-                        if state.map[nx][ny] != 1 and (nx,ny) not in state.positions_of_boxes:
-                            if (nx,ny) not in reachable:
-                                reachable.add((nx,ny))
-                                dq.append((nx,ny))
+                # pushes are (box, move) pairs; walk the player between them for the final answer
+                return expand_pushes(start, path)
+            stats.expanded += 1
+            if f - g < stats.best_h:
+                stats.best_h = f - g
+            if stats.expanded >= progress_at:
+                stats.bound = f
+                progress_at = self.report_progress()
+            # compute reachable cells for the player, boxes block the way
+            fill(player, state.boxes)
+            reachable = flood.contains
+            children = []
             # for each box, try push in each direction
-            for (bx, by), box_name in state.positions_of_boxes.items():
-                for dir, dx, dy, box_move in [
-                    (LEFT, 0,-1, BOX_LEFT),
-                    (RIGHT,0,1, BOX_RIGHT),
-                    (UP, 1,0, BOX_UP),
-                    (DOWN,-1,0, BOX_DOWN)
-                ]:
-                    # target cell for push
-                    tx, ty = bx + dx, by + dy
-                    # player must stand opposite side
-                    px, py = bx - dx, by - dy
-                    if (px,py) in reachable and 0 <= tx < state.length and 0 <= ty < state.width:
-                        # skip validity check: rely on apply_move catching invalid pushes
-                        # generate next state
-                        nxt = state.copy()
-                        try:
-                            nxt.apply_move(box_move)
-                        except ValueError:
-                            continue
-                        # prune simple corner deadlocks
-                        if self.is_deadlock(nxt):
-                            continue
-                        new_g = g + 1
-                        key = (tuple(sorted(nxt.positions_of_boxes.keys())), (nxt.player.x, nxt.player.y))
+            for box in boxes:
+                for move, d in push_moves:
+                    # player must stand opposite side, box needs a free cell in front
+                    if not reachable(box - d) or walls[box + d] or box + d in state.boxes:
+                        continue
+                    # generate next state in place, following any macro the push starts
+                    prev = do_push(state, box, d)
+                    macro = follow(state.boxes, box + d, d) if starts is not None and starts[d][box + d] else ()
+                    prevs = [do_push(state, b, e) for b, _, e in macro]
+                    end = macro[-1][0] + macro[-1][2] if macro else box + d
+                    # prune deadlocked states before they are queued
+                    if is_deadlock(state, end):
+                        stats.pruned += 1
+                    else:
+                        if macro:
+                            state.move_player(flood.top_left(state.player, state.boxes))
+                        else:
+                            state.move_player(flood.top_left_after_push(player, box, d, state.boxes))
+                        key = state.hash
+                        new_g = g + 1 + len(macro)
                         if key not in best_g or new_g < best_g[key]:
                             best_g[key] = new_g
-                            h = self.heuristic(nxt)
-                            heapq.heappush(open_heap, (new_g + h, new_g, nxt, path + [box_move]))
+                            h = heuristic(state) if batch_heuristic is None else 0
+                            pushes = [(box, move)] + [(b, m) for b, m, _ in macro]
+                            children.append((h, key, state.player, tuple(state.boxes), pushes, new_g))
+                        else:
+                            stats.duplicates += 1
+                    for (b, _, e), pv in zip(reversed(macro), reversed(prevs)):
+                        undo_push(state, b, e, pv)
+                    undo_push(state, box, d, prev)
+            if batch_heuristic is not None and children:
+                values = batch_heuristic([c[3] for c in children])
+                children = [(int(h) if self.pdb is None else max(int(h), self.pdb.value(c[3])),) + c[1:]
+                            for c, h in zip(children, values)]
+            stats.generated += len(children)
+            for h, key, player, child_boxes, pushes, new_g in children:
+                heappush(open_heap, (new_g + h, new_g, entry_count, key, player, child_boxes, path + pushes))
+                entry_count += 1
+            if len(open_heap) > stats.max_open:
+                stats.max_open = len(open_heap)
         return None
-
@@ -1,148 +1,270 @@
 from .solver import Solver
+from .assignment import BoxAssignment
+from .deadlock import DeadlockDetector, Pruner
+from .level import Level
+from .macros import MacroMoves, MACRO_MODES
+from .pattern_database import PatternDatabase
+from .reachability import Reachability
+from .search_state import SearchState, expand_pushes
+from .transposition import TranspositionTable
 from sokoban.map import Map
-from sokoban.moves import LEFT, RIGHT, UP, DOWN, BOX_LEFT, BOX_RIGHT, BOX_UP, BOX_DOWN
 import math
-from collections import deque
 
 
 class PushIDAStarSolver(Solver):
     """
     Push-only IDA* solver.
-    Operates on box-push moves using a heuristic based on the sum of Manhattan distances
-    between boxes and their nearest targets. This ignores player movement and focuses on push actions.
+    Operates on box-push moves using a heuristic based on the optimal matching of boxes
+    to targets on push distances. This ignores player movement and focuses on push actions.
+    Like IDAStarSolver, it keeps a bounded transposition table across iterations.
+    pattern_size=k adds a k-box PatternDatabase bound, taking the larger estimate.
+    Pushed states are checked by `pruner`, a DeadlockDetector unless another is given.
+    `macros` chains forced pushes into one edge, so g counts pushes rather than depth:
+    'tunnels' (the default, push-optimal), 'rooms' (tunnels and goal rooms, which can
+    cost a few extra pushes) or None; see MacroMoves.
     """
 
-    def heuristic(self, state: Map) -> int:
+    def __init__(
+        self,
+        map: Map,
+        tt_entries: int = 1_000_000,
+        tt_bytes: int | None = None,
+        pattern_size: int | None = None,
+        pruner: Pruner | None = None,
+        macros: str | None = 'tunnels'
+    ) -> None:
+        super().__init__(map)
+        # Push distances to every target, computed once per level
+        self.level = Level(map)
+        self.flood = Reachability(self.level)
+        self.tt_entries = tt_entries
+        self.tt_bytes = tt_bytes
+        self.pdb = PatternDatabase(self.level, pattern_size) if pattern_size else None
+        self.pruner = pruner if pruner is not None else DeadlockDetector(self.level)
+        boxes = [self.level.cell(bx, by) for (bx, by) in map.positions_of_boxes]
+        if macros not in MACRO_MODES:
+            raise ValueError(f'macros must be one of {MACRO_MODES}, not {macros!r}')
+        self.macros = MacroMoves(self.level, boxes, goal_rooms=macros == 'rooms') if macros else None
+
+    def heuristic(self, state: SearchState) -> int:
         """
-        Computes the sum of minimum Manhattan distances from each box
-        to the closest target. Acts as an admissible and consistent heuristic.
+        Computes the cost of the cheapest matching of boxes to distinct targets
+        on push distances. Acts as an admissible heuristic.
         """
-        total = 0
-        for (bx, by) in state.positions_of_boxes:
-            dmin = math.inf
-            for (tx, ty) in state.targets:
-                d = abs(bx - tx) + abs(by - ty)
-                if d < dmin:
-                    dmin = d
-            total += dmin
-        return total
-
-    def find_pushes(self, state: Map):
+        h = BoxAssignment(self.level, state.boxes).cost()
+        if self.pdb is not None:
+            h = max(h, self.pdb.value(state.boxes))
+        return h
+
+    def find_pushes(self, state: SearchState) -> list[tuple[int, int, int, int, tuple]]:
         """
         Finds all legal push actions the player can perform from the current state.
 
         Returns:
-            List of move codes (BOX_LEFT, BOX_RIGHT, etc.) representing valid pushes.
+            List of (box cell, push move, offset, top-left player cell after the push,
+            macro) tuples, one per valid push that does not deadlock, where macro holds
+            the (box cell, move, offset) pushes chained after the first one, if any.
+            The player of `state` must already stand on the top-left cell of its region.
         """
-        # Compute all reachable positions for the player (ignoring boxes)
-        reachable = set()
-        dq = deque([(state.player.x, state.player.y)])
-        reachable.add((state.player.x, state.player.y))
-
-        while dq:
-            x, y = dq.popleft()
-            for move, dx, dy in [(LEFT, 0, -1), (RIGHT, 0, 1), (UP, 1, 0), (DOWN, -1, 0)]:
-                nx, ny = x + dx, y + dy
-                if (
-                    0 <= nx < state.length and
-                    0 <= ny < state.width and
-                    state.map[nx][ny] != 1 and
-                    (nx, ny) not in state.positions_of_boxes and
-                    (nx, ny) not in reachable
-                ):
-                    reachable.add((nx, ny))
-                    dq.append((nx, ny))
+        # Compute all reachable positions for the player, boxes block the way
+        flood = self.flood
+        flood.fill(state.player, state.boxes)
+        reachable = flood.contains
+        walls = state.level.walls
+        boxes = state.boxes
 
         pushes = []
         # For each box, check if it can be pushed from a reachable position
-        for (bx, by) in state.positions_of_boxes:
-            for move, dx, dy, code in [
-                (LEFT, 0, -1, BOX_LEFT),
-                (RIGHT, 0, 1, BOX_RIGHT),
-                (UP, 1, 0, BOX_UP),
-                (DOWN, -1, 0, BOX_DOWN)
-            ]:
-                px, py = bx - dx, by - dy  # required player position
-                tx, ty = bx + dx, by + dy  # target box position after push
+        for box in boxes:
+            for move, d in state.level.push_moves:
                 if (
-                    (px, py) in reachable and
-                    0 <= tx < state.length and
-                    0 <= ty < state.width and
-                    state.map[tx][ty] != 1 and
-                    (tx, ty) not in state.positions_of_boxes
+                    reachable(box - d) and  # required player position
+                    not walls[box + d] and  # box position after push
+                    box + d not in boxes
                 ):
-                    pushes.append(code)
+                    pushes.append((box, move, d, -1))
 
-        return pushes
+        # Normalize each child's player while the region above is still marked;
+        # the children's own fills overwrite it once the search descends
+        follow = self.macros.follow if self.macros is not None else None
+        starts = self.macros.starts if self.macros is not None else None
+        children = []
+        for box, move, d, _ in pushes:
+            prev = state.push(box, d)
+            macro = tuple(follow(boxes, box + d, d)) if starts is not None and starts[d][box + d] else ()
+            prevs = [state.push(b, e) for b, _, e in macro]
+            end = macro[-1][0] + macro[-1][2] if macro else box + d
+            if self.pruner.is_deadlock(state, end):
+                self.stats.pruned += 1
+            elif macro:
+                children.append((box, move, d, flood.top_left(state.player, boxes), macro))
+            else:
+                children.append((box, move, d, flood.top_left_after_push(prev, box, d, boxes), macro))
+            self._unpush(state, box, d, prev, macro, prevs)
+
+        return children
+
+    @staticmethod
+    def _unpush(state: SearchState, box: int, d: int, prev: int, macro: tuple, prevs: list[int]) -> None:
+        """
+        Undoes a push of `box` by `d` and the macro pushes chained after it.
+        """
+        for (b, _, e), pv in zip(reversed(macro), reversed(prevs)):
+            state.unpush(b, e, pv)
+        state.unpush(box, d, prev)
 
     def solve(self) -> list[int] | None:
         """
         Entry point for the Push-IDA* solver.
-        Returns a list of box-push move codes that solve the puzzle,
+        Returns the list of moves that solves the puzzle,
         or None if no solution is found.
         """
-        start = self.map.copy()
-        bound = self.heuristic(start)
+        start = SearchState.from_map(self.map, self.level)
+        state = start.copy()
+        # states are keyed with the player on the top-left cell of its region
+        state.move_player(self.flood.top_left(state.player, state.boxes))
+        # Matching kept in sync with the single DFS path, one augmenting phase per push
+        matching = BoxAssignment(self.level, state.boxes)
+        bound = self.heuristic(state)
+        table = TranspositionTable(self.tt_entries, self.tt_bytes)
+        self.new_stats()  # search effort over all iterations
 
-        # Iterative deepening: reset visited and path each iteration
+        # Iterative deepening: every iteration starts a fresh path, the table is kept
         while True:
-            visited = set()
-            visited.add((tuple(sorted(start.positions_of_boxes.keys())), (start.player.x, start.player.y)))
-            path = []
-
-            def search(state: Map, g: int, bound: int) -> tuple[int, list[int] | None]:
-                """
-                Recursive bounded-depth search using heuristic pruning.
-
-                Returns:
-                    - (cost, path) if goal is found
-                    - (new bound, None) if current path exceeds threshold
-                """
-                f = g + self.heuristic(state)
-                if f > bound:
-                    return f, None
-                if state.is_solved():
-                    return f, path.copy()
-
-                min_next = math.inf
-                push_list = self.find_pushes(state)
-
-                for code in push_list:
-                    nxt = state.copy()
-                    try:
-                        nxt.apply_move(code)
-                    except ValueError:
-                        continue  # illegal move, skip
-
-                    key = (
-                        tuple(sorted(nxt.positions_of_boxes.keys())),
-                        (nxt.player.x, nxt.player.y)
-                    )
+            self.stats.bound = bound
+            t, result = self.bounded_search(state, matching, bound, table)
+            if result is not None:
+                return expand_pushes(start, result)
+            if t == math.inf:
+                return None
+            bound = t
 
-                    if key in visited:
-                        continue
+    def bounded_search(
+        self,
+        state: SearchState,
+        matching: BoxAssignment,
+        bound: int,
+        table: TranspositionTable
+    ) -> tuple[float, list[tuple[int, int]] | None]:
+        """
+        Bounded-depth search using heuristic pruning, driven by an explicit stack of
+        per-depth push lists and undo records rather than recursion.
+        Pushes are applied to and undone on the single shared `state` and `matching`.
 
-                    visited.add(key)
-                    path.append(code)
+        Returns:
+            - (bound, pushes) if goal is found
+            - (new bound, None) if current path exceeds threshold
+        """
+        pdb = self.pdb
+        stats = self.stats
+        # Phase-timed when instrumented; deadlock checks are part of find_pushes here
+        find_pushes = self.timed('successors', self.find_pushes)
+        cost = self.timed('heuristic', matching.cost)
+        lookup = self.timed('table', table.get)
+        progress_at = self.next_progress()
 
-                    t, result = search(nxt, g + 1, bound)
+        key = state.hash
+        h = cost()
+        if pdb is not None:
+            h = max(h, pdb.value(state.boxes))
+        entry = lookup(key)
+        if entry is not None:
+            h = max(h, entry[1])
+        if h > bound:
+            return h, None
+        if state.is_solved():
+            return bound, []
 
-                    if result is not None:
-                        return t, result
+        # One slot per depth; the columns double whenever the search goes deeper.
+        # gs holds the pushes made so far, which exceeds the depth once macros chain pushes
+        keys = [key]
+        gs = [0]
+        hs = [h]
+        options = [find_pushes(state)]
+        stats.expanded += 1
+        if h < stats.best_h:
+            stats.best_h = h
+        next_index = [0]
+        min_next = [math.inf]
+        path = [None]
+        undo = [None]
+        columns = (keys, gs, hs, options, next_index, min_next, path, undo)
+        visited = {key}
+        depth = 0
 
-                    if t < min_next:
-                        min_next = t
+        while True:
+            pushes = options[depth]
+            i = next_index[depth]
+            if i < len(pushes):
+                next_index[depth] = i + 1
+                box, code, d, top_left, macro = pushes[i]
+                prev = state.push(box, d)
+                prevs = [state.push(b, e) for b, _, e in macro]
+                state.move_player(top_left)
+                key = state.hash
 
-                    path.pop()
-                    visited.remove(key)
+                if key in visited:
+                    self._unpush(state, box, d, prev, macro, prevs)
+                    stats.duplicates += 1
+                    continue
 
-                return min_next, None
+                stats.generated += 1
+                g = gs[depth] + 1 + len(macro)
+                token = matching.move_box(box, macro[-1][0] + macro[-1][2] if macro else box + d)
+                h = cost()
+                if pdb is not None:
+                    h = max(h, pdb.value(state.boxes))
+                entry = lookup(key)
+                if entry is not None:
+                    if entry[0] < g:
+                        matching.restore(token)
+                        self._unpush(state, box, d, prev, macro, prevs)
+                        stats.duplicates += 1
+                        continue  # reached with fewer pushes elsewhere
+                    if entry[1] > h:
+                        h = entry[1]
+                f = g + h
+                if f > bound:
+                    matching.restore(token)
+                    self._unpush(state, box, d, prev, macro, prevs)
+                    if f < min_next[depth]:
+                        min_next[depth] = f
+                    continue
 
-            # Depth-first search within current bound
-            t, result = search(start, 0, bound)
-            if result is not None:
-                return result
-            if t == math.inf:
-                return None
-            bound = t
+                path[depth] = ((box, code),) + tuple((b, m) for b, m, _ in macro)
+                if state.is_solved():
+                    return bound, [p for step in path[:depth + 1] for p in step]
 
+                undo[depth] = (d, prev, token, macro, prevs)
+                depth += 1
+                if depth == len(keys):
+                    for column in columns:
+                        column.extend(column)
+                keys[depth] = key
+                gs[depth] = g
+                hs[depth] = h
+                options[depth] = find_pushes(state)
+                stats.expanded += 1
+                if h < stats.best_h:
+                    stats.best_h = h
+                if stats.expanded >= progress_at:
+                    progress_at = self.report_progress()
+                next_index[depth] = 0
+                min_next[depth] = math.inf
+                visited.add(key)
+                if depth > stats.max_open:
+                    stats.max_open = depth  # the open list of a depth-first search is its path
+            else:
+                t = min_next[depth]
+                g = gs[depth]
+                table.store(keys[depth], g, t - g if t != math.inf else hs[depth])
+                visited.remove(keys[depth])
+                if depth == 0:
+                    return t, None
+                depth -= 1
+                box, _ = path[depth][0]
+                d, prev, token, macro, prevs = undo[depth]
+                matching.restore(token)
+                self._unpush(state, box, d, prev, macro, prevs)
+                if t < min_next[depth]:
+                    min_next[depth] = t
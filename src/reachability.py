@@ -0,0 +1,93 @@
+from .level import Level
+from array import array
+
+
+class Reachability:
+    """
+    Player flood fill over the level's precomputed adjacency lists.
+    Visited cells are marked with a per-fill stamp in a reused array, so a fill
+    allocates nothing but its cell list and membership tests are one index.
+    After a push, top_left_after_push() extends the parent's region instead of
+    refilling it whenever the pushed box did not land inside that region.
+    """
+
+    def __init__(self, level: Level) -> None:
+        self.neighbours = level.neighbours
+        self.mark = array('L', [0]) * level.size
+        self.scratch = array('L', [0]) * level.size
+        self.stamp = 0
+        self.scratch_stamp = 0
+
+    def fill(self, start: int, boxes) -> list[int]:
+        """
+        Marks the region reachable from `start` and returns its cells; contains()
+        answers for this region until the next fill.
+        """
+        self.stamp += 1
+        stamp = self.stamp
+        mark = self.mark
+        neighbours = self.neighbours
+        mark[start] = stamp
+        cells = [start]
+        stack = [start]
+        while stack:
+            c = stack.pop()
+            for n in neighbours[c]:
+                if mark[n] != stamp and n not in boxes:
+                    mark[n] = stamp
+                    cells.append(n)
+                    stack.append(n)
+        return cells
+
+    def contains(self, cell: int) -> bool:
+        return self.mark[cell] == self.stamp
+
+    def top_left(self, start: int, boxes) -> int:
+        """
+        Top-left (smallest) cell of the region around `start`, without disturbing
+        the region marked by the last fill().
+        """
+        self.scratch_stamp += 1
+        stamp = self.scratch_stamp
+        mark = self.scratch
+        neighbours = self.neighbours
+        mark[start] = stamp
+        best = start
+        stack = [start]
+        while stack:
+            c = stack.pop()
+            for n in neighbours[c]:
+                if mark[n] != stamp and n not in boxes:
+                    mark[n] = stamp
+                    if n < best:
+                        best = n
+                    stack.append(n)
+        return best
+
+    def top_left_after_push(self, region_min: int, box: int, d: int, boxes) -> int:
+        """
+        Top-left cell of the player's region after pushing `box` by `d`, where the last
+        fill() is the region before the push and `boxes` already holds the pushed box.
+        If the box landed outside the old region, nothing was cut off: the new region is
+        the old one plus whatever opens up behind the box, so only that part is flooded.
+        """
+        if self.contains(box + d):
+            return self.top_left(box, boxes)
+        self.scratch_stamp += 1
+        stamp = self.scratch_stamp
+        mark = self.scratch
+        region = self.mark
+        old = self.stamp
+        neighbours = self.neighbours
+        mark[box] = stamp
+        best = min(region_min, box)
+        stack = [box]
+        while stack:
+            c = stack.pop()
+            for n in neighbours[c]:
+                if mark[n] != stamp and region[n] != old and n not in boxes:
+                    mark[n] = stamp
+                    if n < best:
+                        best = n
+                    stack.append(n)
+        return best
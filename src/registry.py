@@ -0,0 +1,75 @@
+import importlib
+import importlib.util
+import sys
+
+# key -> (display name, module, class); a solver's module is imported the first time it is asked for
+SOLVERS = {
+    'ida': ('IDA*', 'search_methods.ida_star', 'IDAStarSolver'),
+    'astar': ('A*', 'search_methods.a_star', 'AStarSolver'),
+    'push-astar': ('Push-A*', 'search_methods.push_a_star', 'PushAStarSolver'),
+    'push-ida': ('Push-IDA*', 'search_methods.push_idastar', 'PushIDAStarSolver'),
+    'sma': ('SMA*', 'search_methods.sma_star', 'MemoryBoundedAStarSolver'),
+    'ara': ('ARA*', 'search_methods.ara_star', 'AnytimeAStarSolver'),
+    'hda': ('HDA*', 'search_methods.hda_star', 'HDAStarSolver'),
+    'bidirectional': ('Bidirectional push', 'search_methods.bidirectional_push', 'BidirectionalPushSolver'),
+    'simanneal': ('SimAnneal', 'search_methods.simulated_annealing', 'SimulatedAnnealingSolver'),
+    'portfolio': ('Portfolio', 'search_methods.portfolio', 'PortfolioSolver'),
+}
+
+# Other spellings accepted on the command line
+ALIASES = {
+    'ida*': 'ida', 'ida-star': 'ida', 'ida_star': 'ida',
+    'a*': 'astar', 'a-star': 'astar', 'a_star': 'astar',
+    'push-a*': 'push-astar', 'push_a_star': 'push-astar',
+    'push-ida*': 'push-ida', 'push_idastar': 'push-ida',
+    'sma*': 'sma',
+    'ara*': 'ara', 'anytime': 'ara',
+    'hda*': 'hda',
+    'simulated-annealing': 'simanneal', 'annealing': 'simanneal',
+    'parallel': 'portfolio',
+}
+
+
+def resolve(name: str) -> str | None:
+    """
+    Registry key for a solver name or alias (case-insensitive), or None if unknown.
+    """
+    name = name.lower()
+    return name if name in SOLVERS else ALIASES.get(name)
+
+
+def solver_class(key: str) -> type:
+    """
+    Imports the solver's module, if that has not happened yet, and returns its class.
+    """
+    _, module, cls = SOLVERS[key]
+    return getattr(importlib.import_module(module), cls)
+
+
+def use_headless_sokoban() -> None:
+    """
+    Registers `sokoban` as a bare package before anything imports it, so sokoban.map
+    and sokoban.moves load without the package __init__ and the plotting it imports
+    (plot_map, save_images, create_gif: matplotlib and PIL). Map and the move names
+    are set on the package; any other name runs the real __init__ the first time it
+    is looked up. Does nothing once sokoban has been imported.
+    """
+    if 'sokoban' in sys.modules:
+        return
+    spec = importlib.util.find_spec('sokoban')
+    if spec is None or spec.submodule_search_locations is None:
+        return
+    package = importlib.util.module_from_spec(spec)
+
+    def __getattr__(name: str):
+        del package.__getattr__
+        spec.loader.exec_module(package)
+        return getattr(package, name)
+
+    package.__getattr__ = __getattr__
+    sys.modules['sokoban'] = package
+    moves = importlib.import_module('sokoban.moves')
+    for name, value in vars(moves).items():
+        if not name.startswith('_'):
+            setattr(package, name, value)
+    package.Map = importlib.import_module('sokoban.map').Map
@@ -0,0 +1,246 @@
+from .level import Level
+from sokoban.map import Map
+from collections import deque
+
+
+class SearchState:
+    """
+    Mutable Sokoban state used inside the search loops.
+    Holds only the player cell, the set of box cells and the Zobrist hash over a
+    shared Level, and is changed in place with do_move/undo_move so that a
+    depth-first search walks one path without allocating a state per node.
+    """
+
+    __slots__ = ('level', 'player', 'boxes', 'hash')
+
+    def __init__(self, level: Level, player: int, boxes) -> None:
+        self.level = level
+        self.player = player
+        self.boxes = set(boxes)
+        self.hash = level.zobrist.hash(player, self.boxes)
+
+    @classmethod
+    def from_map(cls, state: Map, level: Level | None = None) -> 'SearchState':
+        """
+        Builds a search state from a sokoban Map, creating its Level if none is given.
+        """
+        if level is None:
+            level = Level(state)
+        player = level.cell(state.player.x, state.player.y)
+        boxes = [level.cell(bx, by) for (bx, by) in state.positions_of_boxes]
+        return cls(level, player, boxes)
+
+    def copy(self) -> 'SearchState':
+        clone = SearchState.__new__(SearchState)
+        clone.level = self.level
+        clone.player = self.player
+        clone.boxes = set(self.boxes)
+        clone.hash = self.hash
+        return clone
+
+    def load(self, player: int, boxes, h: int) -> None:
+        """
+        Overwrites this state with a stored (player, boxes, hash) snapshot.
+        """
+        self.player = player
+        self.boxes = set(boxes)
+        self.hash = h
+
+    def is_solved(self) -> bool:
+        return self.boxes <= self.level.targets
+
+    def legal_moves(self) -> list[int]:
+        """
+        Lists the moves Map.filter_possible_moves would allow in this state.
+        """
+        level = self.level
+        walls = level.walls
+        boxes = self.boxes
+        p = self.player
+        moves = []
+        for move, d in level.deltas.items():
+            n = p + d
+            if walls[n]:
+                continue
+            if move in level.pulls:
+                if n not in boxes and p - d in boxes:
+                    moves.append(move)
+            elif n not in boxes or (not walls[n + d] and n + d not in boxes):
+                moves.append(move)
+        return moves
+
+    def box_move(self, move: int) -> tuple[int, int]:
+        """
+        (from, to) cells of the box a legal move would shift, or (-1, -1) if it moves
+        no box; the state is not changed, so a move can be scored before it is made.
+        """
+        d = self.level.deltas[move]
+        p = self.player
+        if move in self.level.pulls:
+            return p - d, p
+        if p + d in self.boxes:
+            return p + d, p + 2 * d
+        return -1, -1
+
+    def do_move(self, move: int) -> int:
+        """
+        Applies a legal move in place.
+        Returns the cell the moved box started on, or -1 if no box moved;
+        pass it back to undo_move to revert the move.
+        """
+        level = self.level
+        keys = level.zobrist
+        d = level.deltas[move]
+        p = self.player
+        n = p + d
+        boxes = self.boxes
+
+        box_from = -1
+        if move in level.pulls:
+            box_from, box_to = p - d, p
+        elif n in boxes:
+            box_from, box_to = n, n + d
+        if box_from >= 0:
+            boxes.remove(box_from)
+            boxes.add(box_to)
+            self.hash ^= keys.box_keys[box_from] ^ keys.box_keys[box_to]
+
+        self.player = n
+        self.hash ^= keys.player_keys[p] ^ keys.player_keys[n]
+        return box_from
+
+    def undo_move(self, move: int, box_from: int) -> None:
+        """
+        Reverts a move previously applied with do_move.
+        """
+        level = self.level
+        keys = level.zobrist
+        d = level.deltas[move]
+        n = self.player
+        p = n - d
+
+        if box_from >= 0:
+            box_to = p if move in level.pulls else box_from + d
+            self.boxes.remove(box_to)
+            self.boxes.add(box_from)
+            self.hash ^= keys.box_keys[box_from] ^ keys.box_keys[box_to]
+
+        self.player = p
+        self.hash ^= keys.player_keys[p] ^ keys.player_keys[n]
+
+    def push(self, box: int, d: int) -> int:
+        """
+        Teleports the player behind `box` and pushes it by offset `d`.
+        Returns the previous player cell, to be passed back to unpush.
+        """
+        keys = self.level.zobrist
+        p = self.player
+        self.boxes.remove(box)
+        self.boxes.add(box + d)
+        self.player = box
+        self.hash ^= keys.box_keys[box] ^ keys.box_keys[box + d]
+        self.hash ^= keys.player_keys[p] ^ keys.player_keys[box]
+        return p
+
+    def unpush(self, box: int, d: int, player: int) -> None:
+        """
+        Reverts a push previously applied with push, wherever the player has moved since.
+        """
+        keys = self.level.zobrist
+        self.boxes.remove(box + d)
+        self.boxes.add(box)
+        self.hash ^= keys.box_keys[box] ^ keys.box_keys[box + d]
+        self.hash ^= keys.player_keys[self.player] ^ keys.player_keys[player]
+        self.player = player
+
+    def pull(self, box: int, d: int) -> int:
+        """
+        Reverse of a push: drags `box` by offset `d`, leaving the player one cell beyond it.
+        Returns the previous player cell.
+        """
+        keys = self.level.zobrist
+        p = self.player
+        self.boxes.remove(box)
+        self.boxes.add(box + d)
+        self.player = box + 2 * d
+        self.hash ^= keys.box_keys[box] ^ keys.box_keys[box + d]
+        self.hash ^= keys.player_keys[p] ^ keys.player_keys[box + 2 * d]
+        return p
+
+    def reachable(self) -> set[int]:
+        """
+        Cells the player can walk to without moving any box.
+        """
+        walls = self.level.walls
+        boxes = self.boxes
+        deltas = [d for _, d in self.level.push_moves]
+        seen = {self.player}
+        dq = deque([self.player])
+        while dq:
+            c = dq.popleft()
+            for d in deltas:
+                n = c + d
+                if not walls[n] and n not in boxes and n not in seen:
+                    seen.add(n)
+                    dq.append(n)
+        return seen
+
+    def move_player(self, cell: int) -> int:
+        """
+        Puts the player on `cell` without touching any box. Returns the previous player cell.
+        """
+        keys = self.level.zobrist
+        p = self.player
+        self.player = cell
+        self.hash ^= keys.player_keys[p] ^ keys.player_keys[cell]
+        return p
+
+    def normalize(self) -> int:
+        """
+        Moves the player to the top-left cell of its reachable region, so that states
+        differing only by where the player stands inside one region share a hash.
+        Returns the previous player cell.
+        """
+        return self.move_player(min(self.reachable()))
+
+    def walk(self, goal: int) -> list[int] | None:
+        """
+        Shortest list of plain moves taking the player to `goal` without touching a box,
+        or None if the goal cannot be reached.
+        """
+        walls = self.level.walls
+        boxes = self.boxes
+        parent = {self.player: None}
+        dq = deque([self.player])
+        while dq:
+            c = dq.popleft()
+            if c == goal:
+                moves = []
+                while parent[c] is not None:
+                    c, move = parent[c]
+                    moves.append(move)
+                moves.reverse()
+                return moves
+            for move, d in self.level.push_moves:
+                n = c + d
+                if not walls[n] and n not in boxes and n not in parent:
+                    parent[n] = (c, move)
+                    dq.append(n)
+        return None
+
+
+def expand_pushes(state: SearchState, pushes: list[tuple[int, int]]) -> list[int]:
+    """
+    Turns a sequence of (box cell, push move) pairs found by a push-level search
+    into the full list of moves, walking the player behind each box first.
+    `state` is the start state and is left unchanged.
+    """
+    state = state.copy()
+    deltas = state.level.deltas
+    moves = []
+    for box, move in pushes:
+        d = deltas[move]
+        moves.extend(state.walk(box - d))
+        moves.append(move)
+        state.push(box, d)
+    return moves
@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from registry import SOLVERS, solver_class, use_headless_sokoban
+
+# Nothing here plots: sokoban is loaded without its matplotlib/PIL imports, unless already loaded
+use_headless_sokoban()
+from sokoban.map import Map
+from search_methods.solver import SolveCancelled
+from benchmark import count_box_moves
+
+# Expansions between the checkpoints where a job reports progress and looks for a cancel
+PROGRESS_EVERY = 1_000
+# Progress events kept for a job whose stream is not being read; older ones are dropped
+EVENT_BUFFER = 64
+# How long past its deadline a job may keep its worker before the caller is answered anyway
+DEADLINE_GRACE = 2.0
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def run_job(job_id: int, solver_key: str, level: Map, options: dict, deadline: float | None,
+            every: int, emit, cancelled) -> dict:
+    """
+    Solves one job where it is called (a pool process or a service thread).
+    `emit(job_id, kind, payload)` sends events back and `cancelled()` tells whether
+    the caller gave up; both are looked at only at the solver's checkpoints.
+    """
+    started = time.time()
+    record = {'job': job_id, 'solver': SOLVERS[solver_key][0]}
+
+    def stop() -> str | None:
+        if cancelled():
+            return 'cancelled'
+        if deadline is not None and time.time() > deadline:
+            return 'deadline'
+        return None
+
+    def progress(stats) -> None:
+        emit(job_id, 'progress', {
+            'expanded': stats.expanded,
+            'generated': stats.generated,
+            'best_h': stats.best_h if stats.best_h != float('inf') else None,
+            'bound': stats.bound,
+            'elapsed': round(time.time() - started, 3),
+        })
+
+    moves = None
+    try:
+        solver = solver_class(solver_key)(level, **options)
+        solver.instrument(timers=False, progress=progress, every=every).cancellable(stop, every)
+        emit(job_id, 'started', {'pid': os.getpid()})
+        moves = solver.solve()
+        record['status'] = 'solved' if moves is not None else 'failed'
+        record['stats'] = solver.stats.as_dict()
+    except SolveCancelled as e:
+        record['status'] = e.reason
+    except MemoryError:
+        record['status'] = 'memory'
+    except Exception as e:
+        record['status'] = f'error: {e}'
+    record['time'] = time.time() - started
+    if moves is not None and not count_box_moves(level, moves)[2]:
+        moves, record['status'] = None, 'invalid'
+    record['moves'] = moves
+    return record
+
+
+# Per-process globals of the process pool, set once by _init_worker
+_worker_events = None
+_worker_cancel = None
+
+
+def _init_worker(events, cancel) -> None:
+    global _worker_events, _worker_cancel
+    _worker_events, _worker_cancel = events, cancel
+
+
+def _process_job(job: tuple) -> dict:
+    """
+    Pool task: run_job() with events sent over the shared queue and the cancel flag
+    read from the job's worker slot.
+    """
+    job_id, slot, solver_key, level, options, deadline, every = job
+    return run_job(job_id, solver_key, level, options, deadline, every,
+                   lambda *event: _worker_events.put(event), lambda: _worker_cancel[slot])
+
+
+class SolveJob:
+    """
+    Handle of a submitted job. `await job.result()` gives the final record
+    (job, solver, status, moves, time and, when the search finished, stats); status is
+    'solved', 'failed', 'cancelled', 'deadline', 'invalid', 'memory' or 'error: ...'.
+    `async for event in job.events()` streams 'queued', 'started' and 'progress' events
+    and ends with the 'done' event holding the record.
+    """
+
+    def __init__(self, job_id: int, solver_key: str, level: Map, options: dict,
+                 deadline: float | None) -> None:
+        self.id = job_id
+        self.solver_key = solver_key
+        self.level = level
+        self.options = options
+        self.deadline = deadline
+        self.status = 'queued'
+        self.slot = None
+        self._events = asyncio.Queue()
+        self._done = asyncio.get_running_loop().create_future()
+
+    def done(self) -> bool:
+        return self._done.done()
+
+    async def result(self) -> dict:
+        return await asyncio.shield(self._done)
+
+    async def events(self):
+        while True:
+            event = await self._events.get()
+            yield event
+            if event['event'] == 'done':
+                return
+
+    def _push(self, kind: str, payload: dict) -> None:
+        # A slow reader loses the oldest events rather than holding up the service
+        if self._events.qsize() >= EVENT_BUFFER:
+            self._events.get_nowait()
+        self._events.put_nowait({'job': self.id, 'event': kind, **payload})
+
+    def _finish(self, record: dict) -> None:
+        if self._done.done():
+            return
+        self.status = record['status']
+        self._push('done', record)
+        self._done.set_result(record)
+
+
+class SolveService:
+    """
+    asyncio front end running solver jobs on `workers` processes (or threads with
+    in_process=True, for tests and notebooks).
+    - At most `max_queue` jobs wait for a worker; submit() then waits for room, or
+      raises ServiceBusy with wait=False.
+    - A job's `deadline` (seconds from submission) covers its time in the queue too.
+    - cancel() and deadlines are cooperative: the solver stops at its next checkpoint,
+      every `every` expansions. A job stuck past deadline + DEADLINE_GRACE is answered
+      'deadline' at once, but its worker stays busy until the solver returns.
+    Use as `async with SolveService(...) as service:`.
+    """
+
+    def __init__(self, workers: int = os.cpu_count() or 1, max_queue: int = 64,
+                 every: int = PROGRESS_EVERY, in_process: bool = False) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self.every = every
+        self.in_process = in_process
+        self.jobs: dict[int, SolveJob] = {}
+        self._ids = itertools.count(1)
+        self._pending = None
+        self._dispatchers = []
+        self._executor = None
+        self._events = None
+        self._reader = None
+        self._cancel = None
+        self._loop = None
+
+    async def __aenter__(self) -> 'SolveService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._pending = asyncio.Queue(self.max_queue)
+        if self.in_process:
+            self._cancel = [False] * self.workers
+            self._executor = ThreadPoolExecutor(self.workers)
+        else:
+            self._cancel = mp.Array('b', self.workers, lock=False)
+            self._events = mp.Queue()
+            self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                 initargs=(self._events, self._cancel))
+            # Events from the pool arrive on a blocking queue; one thread hands them to the loop
+            self._reader = threading.Thread(target=self._read_events, daemon=True)
+            self._reader.start()
+        self._dispatchers = [asyncio.create_task(self._dispatch(slot)) for slot in range(self.workers)]
+
+    async def close(self) -> None:
+        """
+        Cancels every job still queued or running and shuts the workers down.
+        """
+        for job in list(self.jobs.values()):
+            self.cancel(job.id)
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        await self._loop.run_in_executor(None, self._executor.shutdown)
+        if self._events is not None:
+            self._events.put(None)
+            self._reader.join()
+
+    async def submit(self, level: Map | str, solver: str = 'push-astar', deadline: float | None = None,
+                     options: dict | None = None, wait: bool = True) -> SolveJob:
+        """
+        Queues a level (a Map or a level string) for `solver`, one of the benchmark keys.
+        `options` go to the solver's constructor.
+        """
+        if solver not in SOLVERS:
+            raise ValueError(f'unknown solver: {solver}')
+        if isinstance(level, str):
+            level = Map.from_str(level)
+        job = SolveJob(next(self._ids), solver, level, options or {},
+                       time.time() + deadline if deadline is not None else None)
+        if not wait and self._pending.full():
+            raise ServiceBusy(f'{self.max_queue} jobs already waiting')
+        self.jobs[job.id] = job
+        job._push('queued', {'solver': SOLVERS[solver][0], 'waiting': self._pending.qsize()})
+        await self._pending.put(job)
+        return job
+
+    async def solve(self, level: Map | str, solver: str = 'push-astar', deadline: float | None = None,
+                    options: dict | None = None) -> dict:
+        job = await self.submit(level, solver, deadline, options)
+        return await job.result()
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Asks a job to stop. Returns False if it had already finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.done():
+            return False
+        if job.slot is not None:
+            self._cancel[job.slot] = True
+        else:
+            job._finish({'job': job.id, 'solver': SOLVERS[job.solver_key][0], 'status': 'cancelled',
+                         'time': 0.0, 'moves': None})
+            self.jobs.pop(job.id, None)
+        return True
+
+    async def _dispatch(self, slot: int) -> None:
+        """
+        One per worker slot: takes the next waiting job and runs it on the executor.
+        """
+        loop = self._loop
+        while True:
+            job = await self._pending.get()
+            if job.done():
+                continue  # cancelled while waiting
+            if job.deadline is not None and time.time() > job.deadline:
+                job._finish({'job': job.id, 'solver': SOLVERS[job.solver_key][0], 'status': 'deadline',
+                             'time': 0.0, 'moves': None})
+                self.jobs.pop(job.id, None)
+                continue
+
+            job.slot = slot
+            job.status = 'running'
+            self._cancel[slot] = False
+            if self.in_process:
+                cancel = self._cancel
+                future = loop.run_in_executor(
+                    self._executor, run_job, job.id, job.solver_key, job.level, job.options, job.deadline,
+                    self.every, lambda *event: loop.call_soon_threadsafe(self._deliver, event),
+                    lambda: cancel[slot])
+            else:
+                future = loop.run_in_executor(
+                    self._executor, _process_job,
+                    (job.id, slot, job.solver_key, job.level, job.options, job.deadline, self.every))
+            try:
+                if job.deadline is None:
+                    record = await future
+                else:
+                    timeout = max(0.0, job.deadline - time.time()) + DEADLINE_GRACE
+                    try:
+                        record = await asyncio.wait_for(asyncio.shield(future), timeout)
+                    except asyncio.TimeoutError:
+                        job._finish({'job': job.id, 'solver': SOLVERS[job.solver_key][0], 'status': 'deadline',
+                                     'time': time.time() - job.deadline, 'moves': None})
+                        self._cancel[slot] = True
+                        record = await future  # the slot is free only once the worker is
+            except asyncio.CancelledError:
+                # The service is closing: the worker stops at its next checkpoint
+                self._cancel[slot] = True
+                job._finish({'job': job.id, 'solver': SOLVERS[job.solver_key][0], 'status': 'cancelled',
+                             'time': 0.0, 'moves': None})
+                raise
+            except Exception as e:  # the worker process died
+                record = {'job': job.id, 'solver': SOLVERS[job.solver_key][0], 'status': f'error: {e}',
+                          'time': 0.0, 'moves': None}
+            job._finish(record)
+            self.jobs.pop(job.id, None)
+
+    def _read_events(self) -> None:
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            self._loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: tuple) -> None:
+        job_id, kind, payload = event
+        job = self.jobs.get(job_id)
+        if job is not None and not job.done():
+            job._push(kind, payload)
+
+
+class LocalClient:
+    """
+    In-process stand-in for a remote client of the service: it speaks only level
+    strings, job ids and JSON-ready dicts, so tests can drive the request API without
+    a network in between.
+    """
+
+    def __init__(self, service: SolveService) -> None:
+        self.service = service
+
+    async def submit(self, level: str, solver: str = 'push-astar', deadline: float | None = None,
+                     options: dict | None = None) -> int:
+        job = await self.service.submit(level, solver, deadline, options, wait=False)
+        return job.id
+
+    async def stream(self, job_id: int):
+        """
+        Yields the job's events as JSON strings, ending with its 'done' event.
+        """
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        async for event in job.events():
+            yield json.dumps(event)
+
+    async def result(self, job_id: int) -> dict:
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return json.loads(json.dumps(await job.result()))
+
+    async def cancel(self, job_id: int) -> bool:
+        return self.service.cancel(job_id)
+
+    async def solve(self, level: str, solver: str = 'push-astar', deadline: float | None = None,
+                    options: dict | None = None) -> dict:
+        return await self.result(await self.submit(level, solver, deadline, options))
+
+
+async def _serve(paths: list[str], solver: str, workers: int, deadline: float | None) -> int:
+    async with SolveService(workers) as service:
+        jobs = [await service.submit(Map.from_yaml(path), solver, deadline) for path in paths]
+
+        async def follow(path: str, job: SolveJob) -> str:
+            async for event in job.events():
+                event['map'] = path
+                print(json.dumps(event), flush=True)
+            return job.status
+
+        statuses = await asyncio.gather(*(follow(path, job) for path, job in zip(paths, jobs)))
+    return 0 if all(status == 'solved' for status in statuses) else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Solve levels through the async solve service, '
+                                                 'printing its event stream as JSON lines.')
+    parser.add_argument('maps', nargs='+', help='map files (.yaml)')
+    parser.add_argument('--solver', default='push-astar', choices=list(SOLVERS),
+                        help='engine to solve with (default: push-astar)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='pool size (default: CPU count)')
+    parser.add_argument('--deadline', type=float, help='seconds per level, counted from submission')
+    args = parser.parse_args(argv)
+    return asyncio.run(_serve(args.maps, args.solver, args.workers, args.deadline))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,131 @@
-from .solver import Solver
+from .solver import Solver, SearchStats
+from .level import Level
+from .search_state import SearchState
 from sokoban.map import Map
 from sokoban.moves import *
+import multiprocessing as mp
 import random
 import math
+import sys
+
+# How many iterations a restart runs between checks of the shared stop flag
+STOP_CHECK_INTERVAL = 1024
+# Seconds between checkpoints while parallel restarts run in the pool
+POOL_CHECK_INTERVAL = 0.1
+
+
+def box_costs(level: Level) -> list[int]:
+    """
+    Cost of a box standing on each cell: Manhattan distance to the nearest target,
+    plus a penalty of 10 when the cell is not a target itself. The cost of a state is
+    the sum over its boxes, so a move changes it by the difference for one box.
+    """
+    targets = [level.coords(t) for t in level.targets]
+    costs = [0] * level.size
+    for c in range(level.size):
+        if level.walls[c]:
+            continue
+        bx, by = level.coords(c)
+        costs[c] = min((abs(bx - tx) + abs(by - ty) for (tx, ty) in targets), default=0)
+        # Penalize boxes not yet on target
+        if c not in level.targets:
+            costs[c] += 10
+    return costs
+
+
+def cost(state: SearchState, costs: list[int]) -> int:
+    """
+    Heuristic cost of a whole state, from the table built by box_costs().
+    """
+    return sum(costs[box] for box in state.boxes)
+
+
+def anneal(
+    initial_state: SearchState,
+    rng: random.Random,
+    initial_temp: float,
+    cooling_rate: float,
+    min_temp: float,
+    max_iter: int,
+    should_stop=None,
+    stats: SearchStats | None = None
+) -> list[int] | None:
+    """
+    One annealing restart from `initial_state`, drawing all randomness from `rng`.
+    Returns the path as soon as the map is solved, or None if the restart runs out of
+    iterations or temperature. `should_stop()` is polled every STOP_CHECK_INTERVAL
+    iterations so a parallel run can abandon restarts that can no longer win.
+    With `stats`, every iteration counts as an expansion and every tried move as a
+    generated state.
+    """
+    current = initial_state.copy()
+    costs = box_costs(current.level)
+    path: list[int] = []
+    curr_cost = cost(current, costs)
+    T = initial_temp  # initial temperature
+
+    # Iterative improvement with temperature-based acceptance
+    for i in range(max_iter):
+        # Early termination if solution is found: the cost is 0 only with every box on a target
+        if curr_cost == 0:
+            return path
+
+        if should_stop is not None and i % STOP_CHECK_INTERVAL == 0 and should_stop():
+            return None
+
+        # Generate neighbors
+        moves_list = current.legal_moves()
+        if not moves_list:
+            break
+
+        # Score the move from the one box it shifts, and only make it if it is accepted
+        mv = rng.choice(moves_list)
+        if stats is not None:
+            stats.expanded += 1
+            stats.generated += 1
+        box_from, box_to = current.box_move(mv)
+        delta = costs[box_to] - costs[box_from] if box_from >= 0 else 0
+
+        # Accept new state based on energy delta or probability
+        if delta < 0 or rng.random() < math.exp(-delta / T):
+            current.do_move(mv)
+            path.append(mv)
+            curr_cost += delta
+
+        # Decrease temperature
+        T *= cooling_rate
+        if T < min_temp:
+            break
+
+    return None
+
+
+# Per-process globals of the worker pool, set once by _init_worker
+_worker_state = None
+_worker_params = None
+_worker_solved = None
+
+
+def _init_worker(initial_state: SearchState, params: tuple, solved) -> None:
+    global _worker_state, _worker_params, _worker_solved
+    _worker_state, _worker_params, _worker_solved = initial_state, params, solved
+
+
+def _run_restart(job: tuple[int, int]) -> tuple[int, list[int] | None]:
+    """
+    Pool task: runs restart `index` with its own seed and publishes it if it solves the map.
+    A restart gives up once a lower-indexed restart has solved, since that one is the answer.
+    """
+    index, seed = job
+    if _worker_solved.value < index:
+        return index, None
+    path = anneal(_worker_state, random.Random(seed), *_worker_params,
+                  should_stop=lambda: _worker_solved.value < index)
+    if path is not None:
+        with _worker_solved.get_lock():
+            if index < _worker_solved.value:
+                _worker_solved.value = index
+    return index, path
 
 
 class SimulatedAnnealingSolver(Solver):
@@ -10,90 +133,72 @@ class SimulatedAnnealingSolver(Solver):
     Simulated Annealing solver:
     Uses a probabilistic approach to explore the state space,
     accepting worse states with decreasing probability to escape local minima.
+    Restarts can run on several worker processes; every restart has its own seed, and
+    the answer is always the lowest-numbered restart that solves the map, so a fixed
+    `seed` gives the same result for any number of workers.
     """
 
+    def __init__(self, map: Map) -> None:
+        super().__init__(map)
+        # Walls and targets are shared by every restart
+        self.level = Level(map)
+
     def solve(
         self,
         initial_temp: float = 5000.0,
         cooling_rate: float = 0.9999,
         min_temp: float = 1e-6,
         max_iter: int = 100000,
-        restarts: int = 20
+        restarts: int = 20,
+        workers: int = 1,
+        seed: int | None = None
     ) -> list[int] | None:
 
-        initial_map = self.map.copy()
-        overall_best_cost = math.inf
-        overall_best_path: list[int] = []
-
-        # Heuristic cost function: total Manhattan distance from boxes to nearest targets
-        def cost(state: Map) -> float:
-            total = 0
-            for (bx, by) in state.positions_of_boxes:
-                dmin = math.inf
-                for (tx, ty) in state.targets:
-                    d = abs(bx - tx) + abs(by - ty)
-                    if d < dmin:
-                        dmin = d
-                total += dmin
-                # Penalize boxes not yet on target
-                if (bx, by) not in state.targets:
-                    total += 10
-            return total
-
-        # Try multiple random restarts to avoid getting stuck in poor regions
-        for attempt in range(restarts):
-            current = initial_map.copy()
-            best = current.copy()
-            path: list[int] = []
-            best_path: list[int] = []
-            curr_cost = cost(current)
-            best_cost = curr_cost
-            T = initial_temp  # initial temperature
-
-            # Iterative improvement with temperature-based acceptance
-            for i in range(max_iter):
-                # Early termination if solution is found
-                if curr_cost == 0 or current.is_solved():
+        initial_state = SearchState.from_map(self.map, self.level)
+        stats = self.new_stats()
+        params = (initial_temp, cooling_rate, min_temp, max_iter)
+
+        # Independent, reproducible seed for every restart
+        seeder = random.Random(seed) if seed is not None else random
+        seeds = [seeder.getrandbits(64) for _ in range(restarts)]
+
+        if workers <= 1:
+            # Progress and cancellation checkpoints ride on the stop poll of anneal()
+            checkpoint = None
+            progress_at = self.next_progress()
+            if progress_at != sys.maxsize:
+                def checkpoint() -> bool:
+                    nonlocal progress_at
+                    if stats.expanded >= progress_at:
+                        progress_at = self.report_progress()
+                    return False
+
+            # Try multiple random restarts to avoid getting stuck in poor regions
+            for attempt in range(restarts):
+                path = anneal(initial_state, random.Random(seeds[attempt]), *params,
+                              should_stop=checkpoint, stats=stats)
+                # Early exit if solution found during restarts
+                if path is not None:
                     return path
+            return None
 
-                # Generate neighbors
-                moves_list = current.filter_possible_moves()
-                if not moves_list:
-                    break
-
-                mv = random.choice(moves_list)
-                nxt = current.copy()
-                nxt.apply_move(mv)
-                new_cost = cost(nxt)
-                delta = new_cost - curr_cost
-
-                # Accept new state based on energy delta or probability
-                if delta < 0 or random.random() < math.exp(-delta / T):
-                    current = nxt
-                    path.append(mv)
-                    curr_cost = new_cost
-
-                    # Update best state found in this restart
-                    if new_cost < best_cost:
-                        best = current.copy()
-                        best_cost = new_cost
-                        best_path = path.copy()
-
-                # Decrease temperature
-                T *= cooling_rate
-                if T < min_temp:
-                    break
-
-            # Update best state across all restarts
-            if best_cost < overall_best_cost:
-                overall_best_cost = best_cost
-                overall_best_path = best_path
-
-            # Early exit if solution found during restarts
-            if overall_best_cost == 0:
-                return overall_best_path
-
-        # Return best path found across all restarts, if any
-        if overall_best_cost == 0:
-            return overall_best_path
+        # Parallel restarts: workers share the index of the best (lowest) solved restart
+        solved = mp.Value('i', restarts)
+        results: dict[int, list[int] | None] = {}
+        checked = self.progress_callback is not None or self.stop_check is not None
+        # Leaving the with block terminates the pool, also when a checkpoint raises SolveCancelled
+        with mp.Pool(workers, initializer=_init_worker, initargs=(initial_state, params, solved)) as pool:
+            restarts_done = pool.imap_unordered(_run_restart, enumerate(seeds))
+            while len(results) < restarts:
+                try:
+                    index, path = restarts_done.next(POOL_CHECK_INTERVAL if checked else None)
+                except mp.TimeoutError:
+                    self.report_progress()
+                    continue
+                results[index] = path
+                # Stop as soon as every restart that could beat the current winner is done
+                winner = solved.value
+                if winner < restarts and all(i in results for i in range(winner + 1)):
+                    pool.terminate()
+                    return results[winner]
         return None
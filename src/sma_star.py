@@ -0,0 +1,196 @@
+from .a_star import AStarSolver
+from .deadlock import Pruner
+from .search_state import SearchState
+from sokoban.map import Map
+from array import array
+import heapq
+
+
+class MemoryBoundedAStarSolver(AStarSolver):
+    """
+    A* with bounded memory, for maps where plain A* runs out of it.
+    Open-list entries keep a node id instead of a path: every generated node is one
+    parent index plus one move byte, and the solution is only rebuilt at the goal.
+    `max_nodes` caps the entries of all search tables together: open list, best-g
+    table, heuristic cache and back-links. Past it, the worst `drop_fraction` of the
+    frontier is forgotten. As in SMA*, each parent of a forgotten node is re-queued
+    with the best f of its dropped children, so the pruned subtrees can be regenerated
+    later. Compaction also forgets closed states, keeping best-g and heuristic entries
+    only for queued ones and back-links only for their ancestors, so a closed state
+    reached again is searched again. The cap should leave room for the f-contour
+    around the solution; far smaller caps make it thrash.
+    """
+
+    def __init__(
+        self,
+        map: Map,
+        max_nodes: int = 4_000_000,
+        drop_fraction: float = 0.5,
+        batch: bool = False,
+        pruner: Pruner | None = None
+    ) -> None:
+        super().__init__(map, batch=batch, pruner=pruner)
+        self.max_nodes = max_nodes
+        self.drop_fraction = drop_fraction
+
+    def solve(self) -> list[int] | None:
+        """
+        Runs memory-bounded A* search.
+        Returns a list of moves (as integers), or None if no solution is found.
+        """
+        state = SearchState.from_map(self.map, self.level)
+        self.root = state.copy()
+        start_key = state.hash
+        stats = self.new_stats()
+        heappush = self.timed('heap', heapq.heappush)
+        heappop = self.timed('heap', heapq.heappop)
+        legal_moves = self.timed('successors', SearchState.legal_moves)
+        do_move = self.timed('successors', SearchState.do_move)
+        undo_move = self.timed('successors', SearchState.undo_move)
+        heuristic = self.timed('heuristic', self.heuristic)
+        score_batch = self.timed('heuristic', self._score_batch)
+        pruned = self.timed('deadlocks', self.pruned)
+        progress_at = self.next_progress()
+
+        # Back-links: node i was reached from parents[i] by moves[i]; node 0 is the root
+        self.parents = array('l', [-1])
+        self.moves = bytearray(b'\x00')
+
+        # Entries are ordered by f, then deepest first, so ties push towards a goal instead of
+        # widening the frontier; the second field is -g
+        open_heap = [(self.heuristic(state), 0, 0, start_key, state.player, tuple(state.boxes), 0)]
+        self.best_g = best_g = {start_key: 0}
+        entry_count = 1
+
+        player_keys = self.level.zobrist.player_keys
+        self.h_cache = h_cache = {}
+
+        while open_heap:
+            f, neg_g, _, key, player, boxes, node = heappop(open_heap)
+            g = -neg_g
+            # Stale entry: the state was reached more cheaply after this one was queued
+            if best_g.get(key, g) < g:
+                continue
+            state.load(player, boxes, key)
+
+            if state.is_solved():
+                return self._path(node)
+
+            stats.expanded += 1
+            if f - g < stats.best_h:
+                stats.best_h = f - g
+            if stats.expanded >= progress_at:
+                stats.bound = f
+                progress_at = self.report_progress()
+            new_g = g + 1
+            children = []
+            for move in legal_moves(state):
+                box_from = do_move(state, move)
+                key = state.hash
+                if key in best_g and best_g[key] <= new_g:
+                    stats.duplicates += 1
+                elif pruned(state, move, box_from):
+                    stats.pruned += 1
+                else:
+                    best_g[key] = new_g
+                    box_key = key ^ player_keys[state.player]
+                    h = h_cache.get(box_key)
+                    if h is None and self.batch_heuristic is None:
+                        h = h_cache[box_key] = heuristic(state)
+                    child_boxes = boxes if box_from < 0 else tuple(state.boxes)
+                    children.append((key, box_key, state.player, child_boxes, move, h))
+                undo_move(state, move, box_from)
+
+            if self.batch_heuristic is not None:
+                children = score_batch(children, h_cache)
+
+            stats.generated += len(children)
+            for key, _, child_player, child_boxes, move, h in children:
+                self.parents.append(node)
+                self.moves.append(move)
+                heappush(open_heap, (new_g + h, -new_g, entry_count, key, child_player,
+                                     child_boxes, len(self.parents) - 1))
+                entry_count += 1
+            if len(open_heap) > stats.max_open:
+                stats.max_open = len(open_heap)
+
+            if self._table_size(open_heap) > self.max_nodes:
+                open_heap, entry_count = self._compact(open_heap, entry_count)
+                best_g, h_cache = self.best_g, self.h_cache
+
+        # No solution found
+        return None
+
+    def _path(self, node: int) -> list[int]:
+        """
+        Rebuilds the move list leading to `node` by following back-links to the root.
+        """
+        path = []
+        while node > 0:
+            path.append(self.moves[node])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    def _table_size(self, open_heap: list) -> int:
+        """
+        Entries held by the open list and the tables beside it, as counted against max_nodes.
+        """
+        return len(open_heap) + len(self.best_g) + len(self.h_cache) + len(self.parents)
+
+    def _compact(self, open_heap: list, entry_count: int) -> tuple[list, int]:
+        """
+        Drops the worst part of the frontier, re-queues the parents of dropped nodes with
+        backed-up f-values, forgets closed states, and renumbers the back-links still
+        reachable from the frontier.
+        """
+        keep = max(1, int(len(open_heap) * (1 - self.drop_fraction)))
+        open_heap.sort()
+        kept, dropped = open_heap[:keep], open_heap[keep:]
+
+        # Remember the best f below each parent of a dropped state
+        backed_up = {}
+        for f, neg_g, _, key, _, _, node in dropped:
+            g = -neg_g
+            parent = self.parents[node]
+            if parent >= 0 and f < backed_up.get(parent, (f + 1,))[0]:
+                backed_up[parent] = (f, g - 1)
+
+        # Only queued states keep a g-value and a cached estimate; closed ones are forgotten
+        best_g = {}
+        for _, neg_g, _, key, _, _, _ in kept:
+            if best_g.get(key, -neg_g + 1) > -neg_g:
+                best_g[key] = -neg_g
+        player_keys = self.level.zobrist.player_keys
+        h_cache = {}
+        for _, _, _, key, player, _, _ in kept:
+            box_key = key ^ player_keys[player]
+            if box_key in self.h_cache:
+                h_cache[box_key] = self.h_cache[box_key]
+
+        # Parents are closed, so rebuild their states from the root to queue them again
+        state = self.root.copy()
+        for parent, (f, g) in backed_up.items():
+            state.load(self.root.player, self.root.boxes, self.root.hash)
+            for move in self._path(parent):
+                state.do_move(move)
+            best_g[state.hash] = min(best_g.get(state.hash, g), g)
+            kept.append((f, -g, entry_count, state.hash, state.player, tuple(state.boxes), parent))
+            entry_count += 1
+
+        # Keep only the back-links some queued node still needs, renumbered in order
+        live = set()
+        for entry in kept:
+            node = entry[6]
+            while node >= 0 and node not in live:
+                live.add(node)
+                node = self.parents[node]
+        order = sorted(live)
+        remap = {old: new for new, old in enumerate(order)}
+        self.parents = array('l', (remap[self.parents[n]] if n else -1 for n in order))
+        self.moves = bytearray(self.moves[n] for n in order)
+        kept = [entry[:6] + (remap[entry[6]],) for entry in kept]
+
+        self.best_g, self.h_cache = best_g, h_cache
+        heapq.heapify(kept)
+        return kept, entry_count
@@ -0,0 +1,145 @@
+from .transitions import MOVE_DELTAS
+from sokoban.map import Map, OBSTACLE_SYMBOL
+from sokoban.moves import LEFT, RIGHT, UP, DOWN
+from collections import deque
+import hashlib
+import os
+import sqlite3
+import time
+
+
+def default_cache_path() -> str:
+    return os.environ.get('SOKOBAN_SOLUTION_CACHE',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'sokoban_solutions.sqlite'))
+
+
+def canonical_level(state: Map) -> tuple[str, tuple[int, int]]:
+    """
+    Hash identifying a level up to details that cannot matter to a solution:
+    cells the player can never walk to are treated as walls, the level is cropped
+    to what remains, and the player is moved to the top-left cell of its region
+    (boxes blocking). Returns the SHA-1 hex digest and that player cell (x, y).
+    """
+    obstacle = state.map
+    boxes = state.positions_of_boxes
+    targets = set(state.targets)
+
+    def free(x: int, y: int) -> bool:
+        return 0 <= x < state.length and 0 <= y < state.width and obstacle[x][y] != OBSTACLE_SYMBOL
+
+    def region(start: tuple[int, int], blocked) -> set[tuple[int, int]]:
+        seen = {start}
+        stack = [start]
+        while stack:
+            x, y = stack.pop()
+            for n in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if n not in seen and n not in blocked and free(*n):
+                    seen.add(n)
+                    stack.append(n)
+        return seen
+
+    start = (state.player.x, state.player.y)
+    player = min(region(start, boxes))
+    kept = region(start, ()) | set(boxes) | targets
+    min_x = min(x for x, _ in kept)
+    min_y = min(y for _, y in kept)
+    max_x = max(x for x, _ in kept)
+    max_y = max(y for _, y in kept)
+
+    rows = []
+    for x in range(min_x, max_x + 1):
+        row = []
+        for y in range(min_y, max_y + 1):
+            c = (x, y)
+            if c not in kept:
+                row.append('#')
+            elif c in boxes:
+                row.append('*' if c in targets else '$')
+            elif c == player:
+                row.append('+' if c in targets else '@')
+            else:
+                row.append('.' if c in targets else ' ')
+        rows.append(''.join(row))
+    return hashlib.sha1('\n'.join(rows).encode()).hexdigest(), player
+
+
+def player_walk(state: Map, goal: tuple[int, int]) -> list[int] | None:
+    """
+    Shortest list of plain moves taking the player of `state` to `goal` without
+    touching a box, or None if the goal cannot be reached.
+    """
+    boxes = state.positions_of_boxes
+    start = (state.player.x, state.player.y)
+    parent = {start: None}
+    dq = deque([start])
+    while dq:
+        c = dq.popleft()
+        if c == goal:
+            moves = []
+            while parent[c] is not None:
+                c, move = parent[c]
+                moves.append(move)
+            moves.reverse()
+            return moves
+        for move in (LEFT, RIGHT, UP, DOWN):
+            dx, dy = MOVE_DELTAS[move]
+            n = (c[0] + dx, c[1] + dy)
+            if (0 <= n[0] < state.length and 0 <= n[1] < state.width and n not in parent
+                    and state.map[n[0]][n[1]] != OBSTACLE_SYMBOL and n not in boxes):
+                parent[n] = (c, move)
+                dq.append(n)
+    return None
+
+
+class SolutionCache:
+    """
+    Persistent store of solved levels, keyed by solver and canonical_level(), so a
+    level seen before (even padded, cropped or with the player elsewhere in its
+    region) is answered without searching, but only with a solution from the solver
+    asked for: an annealing solution must not answer a request for an optimal one.
+    Solutions are kept from the canonical player cell and translated with a short
+    walk on the way in and out. Backed by SQLite; path=None keeps the cache in memory
+    for one run.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path if path is not None else ':memory:')
+        self.db.execute('CREATE TABLE IF NOT EXISTS solutions ('
+                        'key TEXT PRIMARY KEY, moves BLOB, solver TEXT, seconds REAL, created REAL)')
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, state: Map, solver: str = '') -> list[int] | None:
+        """
+        Moves by `solver` (a registry key) solving `state`, or None if there are none.
+        """
+        key, canonical = canonical_level(state)
+        row = self.db.execute('SELECT moves FROM solutions WHERE key = ?', (f'{solver}:{key}',)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return player_walk(state, canonical) + list(row[0])
+
+    def put(self, state: Map, moves: list[int], solver: str = '', seconds: float = 0.0) -> None:
+        """
+        Stores `moves` by `solver` solving `state`, keeping the shorter solution if the
+        solver already has one.
+        """
+        key, canonical = canonical_level(state)
+        key = f'{solver}:{key}'
+        walk_back = player_walk(state, canonical)
+        # Reversing the walk to the canonical cell brings the player back to its start
+        opposite = {LEFT: RIGHT, RIGHT: LEFT, UP: DOWN, DOWN: UP}
+        moves = bytes([opposite[m] for m in reversed(walk_back)] + list(moves))
+        self.db.execute(
+            'INSERT INTO solutions VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET '
+            'moves = excluded.moves, solver = excluded.solver, seconds = excluded.seconds, created = excluded.created '
+            'WHERE length(excluded.moves) < length(solutions.moves)',
+            (key, moves, solver, seconds, time.time()))
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
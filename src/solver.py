@@ -0,0 +1,200 @@
+from sokoban.map import Map
+from collections import Counter
+import math
+import signal
+import sys
+import time
+
+
+class SearchStats:
+    """
+    What a solver did during its last solve():
+    - expanded / generated: states expanded and children queued;
+    - duplicates: children dropped because they were already reached as cheaply;
+    - pruned: children dropped by the deadlock pruner;
+    - max_open: largest open list (or frontier layer) seen;
+    - best_h: smallest heuristic value expanded, where the solver tracks it;
+    - bound: the f-value being searched (IDA* threshold, or f of the last A* expansion
+      at a checkpoint), where the solver has one;
+    - timers: seconds spent per phase, only filled while phase timing is on;
+    - samples: sampled call sites, only filled by Solver.profile(mode='sample').
+    Hashing is incremental inside do_move/push, so it is timed as part of successors.
+    """
+
+    __slots__ = ('expanded', 'generated', 'duplicates', 'pruned', 'max_open', 'best_h', 'bound',
+                 'timers', 'samples')
+
+    def __init__(self) -> None:
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.pruned = 0
+        self.max_open = 0
+        self.best_h = math.inf
+        self.bound = None
+        self.timers: dict[str, float] = {}
+        self.samples: Counter = Counter()
+
+    def as_dict(self) -> dict:
+        return {
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'duplicates': self.duplicates,
+            'pruned': self.pruned,
+            'max_open': self.max_open,
+            'best_h': self.best_h if self.best_h != math.inf else None,
+            'bound': self.bound,
+            'timers': dict(self.timers),
+        }
+
+    def __str__(self) -> str:
+        lines = [f'expanded {self.expanded}, generated {self.generated}, duplicates {self.duplicates}, '
+                 f'pruned {self.pruned}, max open {self.max_open}']
+        for phase, seconds in sorted(self.timers.items(), key=lambda item: -item[1]):
+            lines.append(f'  {phase:12s} {seconds:.3f}s')
+        return '\n'.join(lines)
+
+
+class SolveCancelled(Exception):
+    """
+    Raised out of solve() at a checkpoint once the solver's stop check gave a reason
+    ('cancelled', 'deadline', ...), which is kept in `reason`.
+    """
+
+    def __init__(self, reason: str = 'cancelled') -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Solver(object):
+    """
+    Base class of the search methods: holds the map and the instrumentation surface.
+    Every solve() starts a fresh `stats`. Counters are plain integer increments; phase
+    timers, progress callbacks and profilers are opt-in through instrument() and
+    profile(), and cost nothing when off because the solvers then call the raw
+    functions (see timed()) and only compare against sys.maxsize for progress.
+    The progress checkpoints double as cancellation points, see cancellable().
+    """
+
+    def __init__(self, map: Map) -> None:
+        self.map = map
+        self.stats = SearchStats()
+        self.time_phases = False
+        self.progress_callback = None
+        self.progress_every = 10_000
+        self.stop_check = None
+
+    def solve(self):
+        raise NotImplementedError
+
+    def instrument(self, timers: bool = True, progress=None, every: int = 10_000) -> 'Solver':
+        """
+        Turns on per-phase timers and/or a progress callback, called with the live
+        SearchStats every `every` expansions. Returns the solver for chaining.
+        """
+        self.time_phases = timers
+        self.progress_callback = progress
+        self.progress_every = every
+        return self
+
+    def cancellable(self, check, every: int = 1_000) -> 'Solver':
+        """
+        Calls `check()` at every progress checkpoint, now every `every` expansions; a
+        truthy result is the reason the search must stop, and solve() raises
+        SolveCancelled with it. Returns the solver for chaining.
+        """
+        self.stop_check = check
+        self.progress_every = every
+        return self
+
+    def new_stats(self) -> SearchStats:
+        """
+        Starts the statistics of a new solve() and returns them.
+        """
+        self.stats = SearchStats()
+        return self.stats
+
+    def timed(self, phase: str, fn):
+        """
+        `fn` itself when phase timing is off; otherwise a wrapper adding the time of
+        every call to stats.timers[phase]. Solvers bind the result to a local once,
+        before their main loop.
+        """
+        if not self.time_phases:
+            return fn
+        timers = self.stats.timers
+        timers.setdefault(phase, 0.0)
+        clock = time.perf_counter
+
+        def timed_call(*args):
+            start = clock()
+            try:
+                return fn(*args)
+            finally:
+                timers[phase] += clock() - start
+        return timed_call
+
+    def next_progress(self) -> int:
+        """
+        Expansion count at which the solver should call report_progress() next (the
+        next multiple of progress_every), or sys.maxsize when there is neither a
+        progress callback nor a stop check.
+        """
+        if self.progress_callback is None and self.stop_check is None:
+            return sys.maxsize
+        return (self.stats.expanded // self.progress_every + 1) * self.progress_every
+
+    def report_progress(self) -> int:
+        """
+        Checkpoint: passes the stats to the progress callback, then raises SolveCancelled
+        if the stop check asks for it. Returns the next checkpoint.
+        """
+        if self.progress_callback is not None:
+            self.progress_callback(self.stats)
+        if self.stop_check is not None:
+            reason = self.stop_check()
+            if reason:
+                raise SolveCancelled(reason)
+        return self.next_progress()
+
+    def profile(self, mode: str = 'cprofile', interval: float = 0.001, top: int = 25, **kwargs):
+        """
+        Runs solve(**kwargs) under a profiler and prints the hottest functions.
+        mode='cprofile' uses the deterministic profiler; mode='sample' interrupts the
+        search every `interval` seconds of CPU time (Unix only) and counts the function
+        being run, which disturbs timings far less. Counts end up in stats.samples.
+        """
+        if mode == 'cprofile':
+            # Imported here: cProfile and pstats add noticeably to every process start
+            import cProfile
+            import io
+            import pstats
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                return self.solve(**kwargs)
+            finally:
+                profiler.disable()
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+                print(out.getvalue())
+
+        if mode != 'sample':
+            raise ValueError(f'unknown profile mode: {mode}')
+        samples = Counter()
+
+        def sample(signum, frame):
+            code = frame.f_code
+            samples[f'{code.co_name} ({code.co_filename.rsplit("/", 1)[-1]}:{frame.f_lineno})'] += 1
+
+        previous = signal.signal(signal.SIGPROF, sample)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        try:
+            return self.solve(**kwargs)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+            self.stats.samples = samples
+            total = sum(samples.values()) or 1
+            for site, count in samples.most_common(top):
+                print(f'{100 * count / total:5.1f}%  {site}')
@@ -0,0 +1,16 @@
+from sokoban.moves import LEFT, RIGHT, UP, DOWN, BOX_LEFT, BOX_RIGHT, BOX_UP, BOX_DOWN
+
+# Player displacement (dx, dy) for every move code
+MOVE_DELTAS = {
+    LEFT: (0, -1),
+    RIGHT: (0, 1),
+    UP: (1, 0),
+    DOWN: (-1, 0),
+    BOX_LEFT: (0, -1),
+    BOX_RIGHT: (0, 1),
+    BOX_UP: (1, 0),
+    BOX_DOWN: (-1, 0),
+}
+
+# Moves where the player drags the box behind it instead of pushing the one in front
+PULL_MOVES = frozenset((BOX_LEFT, BOX_RIGHT, BOX_UP, BOX_DOWN))
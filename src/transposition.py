@@ -0,0 +1,51 @@
+from collections import OrderedDict
+
+# Rough CPython cost of one entry: ordered-dict slot and link, int key, value tuple
+ENTRY_BYTES = 200
+
+
+class TranspositionTable:
+    """
+    Bounded map from state hash to (best g seen, learned lower bound on the cost to goal).
+    Kept across the iterations of an iterative-deepening search so later iterations
+    can skip states already reached more cheaply and cut subtrees whose remaining cost
+    was shown to exceed an earlier bound. When full, the least recently used entry is
+    evicted. The cap is `max_entries`, or `max_bytes` converted at ENTRY_BYTES per entry.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000, max_bytes: int | None = None) -> None:
+        if max_bytes is not None:
+            max_entries = max_bytes // ENTRY_BYTES
+        self.max_entries = max(1, max_entries)
+        self.entries: OrderedDict[int, tuple[int, int]] = OrderedDict()
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: int) -> tuple[int, int] | None:
+        """
+        Returns (g, h) stored for `key`, or None, and marks the entry as recently used.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def store(self, key: int, g: int, h: int) -> None:
+        """
+        Records that `key` was reached with cost `g` and needs at least `h` more,
+        keeping the smaller g and the larger bound of the old and new entry.
+        """
+        entries = self.entries
+        old = entries.get(key)
+        if old is not None:
+            entries[key] = (min(old[0], g), max(old[1], h))
+            entries.move_to_end(key)
+            return
+        entries[key] = (g, h)
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The command-line tools (service, batch, registry, ...) are top-level modules in src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+from sokoban.map import Map
+from search_methods.assignment import BoxAssignment, assignment_heuristic
+from search_methods.level import Level, UNREACHABLE
+from test_optimality import random_levels
+
+LEVELS = random_levels(seed=2, count=30) + [
+    '_ _ _ _ _ _\n_ B _ B _ _\n_ _ P _ X _\n_ B _ X _ X',
+    '_ _ _ _ _ _\n_ B B B _ _\n_ X P X _ X\n_ _ _ _ _ _',
+]
+
+
+def from_scratch(level: Level, boxes) -> int:
+    return min(assignment_heuristic(level, boxes), UNREACHABLE)
+
+
+@pytest.mark.parametrize('level_str', LEVELS)
+def test_incremental_matching_follows_box_moves(level_str):
+    crt_map = Map.from_str(level_str)
+    level = Level(crt_map)
+    boxes = {level.cell(x, y) for (x, y) in crt_map.positions_of_boxes}
+    floor = [c for c in range(level.size) if not level.walls[c]]
+    matching = BoxAssignment(level, boxes)
+    assert matching.cost() == from_scratch(level, boxes)
+
+    rng = random.Random(level_str)
+    tokens = []
+    history = [(set(boxes), matching.cost())]
+    for _ in range(25):
+        old = rng.choice(sorted(boxes))
+        new = rng.choice([c for c in floor if c not in boxes])
+        tokens.append(matching.move_box(old, new))
+        boxes.remove(old)
+        boxes.add(new)
+        assert matching.cost() == from_scratch(level, boxes)
+        history.append((set(boxes), matching.cost()))
+
+    # Restoring in reverse order walks back through the same matchings
+    history.pop()
+    for token in reversed(tokens):
+        matching.restore(token)
+        boxes, cost = history.pop()
+        assert matching.cost() == cost == from_scratch(level, boxes)
+
+
+def test_more_boxes_than_targets_is_unsolvable():
+    crt_map = Map.from_str('P B _\n_ B X\n_ _ _')
+    level = Level(crt_map)
+    boxes = [level.cell(x, y) for (x, y) in crt_map.positions_of_boxes]
+    assert BoxAssignment(level, boxes).cost() == UNREACHABLE
+    assert assignment_heuristic(level, boxes) == UNREACHABLE
@@ -0,0 +1,61 @@
+import io
+import json
+
+import pytest
+from sokoban.map import Map
+from search_methods.solution_cache import SolutionCache, canonical_level
+from batch import run_batch
+
+LEVEL = '_ / P _ _\n_ B _ _ _\nX _ _ _ _\nB X _ _ _'
+# The same level behind a ring of walls, with the player elsewhere in its region
+PADDED = ('/ / / / / / /\n/ _ / _ _ P /\n/ _ B _ _ _ /\n/ X _ _ _ _ /\n/ B X _ _ _ /\n'
+          '/ / / / / / /')
+OTHER = '_ / P _ _\n_ _ B _ _\nX _ _ _ _\nB X _ _ _'
+
+
+def replays(level: str, moves: list[int]) -> bool:
+    final = Map.from_str(level)
+    for move in moves:
+        final.apply_move(move)
+    return final.is_solved()
+
+
+def test_canonical_level_ignores_padding_and_player_cell():
+    key, _ = canonical_level(Map.from_str(LEVEL))
+    assert canonical_level(Map.from_str(PADDED))[0] == key
+    assert canonical_level(Map.from_str(OTHER))[0] != key
+
+
+def test_cache_translates_moves_and_keeps_solvers_apart():
+    cache = SolutionCache()
+    counts = run_batch([('level', Map.from_str(LEVEL))], 'astar', 1, None, cache, io.StringIO())
+    assert counts == {'solved': 1}
+    cached = cache.get(Map.from_str(PADDED), 'astar')
+    assert cached is not None and replays(PADDED, cached)
+    # A solution from another solver is not an answer for this one
+    assert cache.get(Map.from_str(LEVEL), 'simanneal') is None
+    cache.close()
+
+
+def test_batch_solves_each_distinct_level_once():
+    cache = SolutionCache()
+    jobs = [('a', Map.from_str(LEVEL)), ('b', Map.from_str(PADDED)), ('c', Map.from_str(OTHER))]
+    out = io.StringIO()
+    counts = run_batch(jobs, 'astar', 2, None, cache, out)
+    lines = {line['map']: line for line in map(json.loads, out.getvalue().splitlines())}
+    assert counts == {'solved': 3, 'cached': 1}
+    assert not lines['a']['cached'] and lines['b']['cached'] and not lines['c']['cached']
+    for name, level in (('a', LEVEL), ('b', PADDED), ('c', OTHER)):
+        assert replays(level, lines[name]['moves'])
+
+    # A second run is answered from the cache, but not for another solver
+    assert run_batch(jobs, 'astar', 2, None, cache, io.StringIO()) == {'solved': 3, 'cached': 3}
+    assert run_batch(jobs[:1], 'ida', 1, None, cache, io.StringIO()) == {'solved': 1}
+    cache.close()
+
+
+@pytest.mark.parametrize('solver_key', ['hda', 'portfolio'])
+def test_batch_runs_engines_with_processes_of_their_own(solver_key):
+    out = io.StringIO()
+    assert run_batch([('a', Map.from_str(LEVEL))], solver_key, 1, None, SolutionCache(), out) == {'solved': 1}
+    assert replays(LEVEL, json.loads(out.getvalue())['moves'])
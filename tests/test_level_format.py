@@ -0,0 +1,56 @@
+import random
+
+import pytest
+from sokoban.map import Map
+from search_methods.level_format import (LevelSet, decode_moves, encode_moves, pack_level, unpack_level,
+                                         write_level_set)
+from test_optimality import LEVELS, MACRO_LEVELS
+
+ROUND_TRIP_LEVELS = LEVELS[:20] + MACRO_LEVELS[:20]
+
+
+def same_level(a: Map, b: Map) -> bool:
+    return (str(a) == str(b)
+            and (a.player.x, a.player.y) == (b.player.x, b.player.y)
+            and sorted(a.positions_of_boxes) == sorted(b.positions_of_boxes)
+            and sorted(a.targets) == sorted(b.targets))
+
+
+@pytest.mark.parametrize('level', ROUND_TRIP_LEVELS)
+def test_pack_unpack_round_trip(level):
+    crt_map = Map.from_str(level)
+    record = pack_level(crt_map, 'name')
+    assert same_level(unpack_level(record), crt_map)
+    # A record unpacks the same from any offset in a larger buffer
+    assert same_level(unpack_level(b'\x00' * 7 + record, 7), crt_map)
+
+
+def test_level_set_round_trip(tmp_path):
+    maps = [Map.from_str(level) for level in ROUND_TRIP_LEVELS]
+    path = str(tmp_path / 'levels.lvls')
+    assert write_level_set(path, [(f'level{i}', m) for i, m in enumerate(maps)]) == len(maps)
+    with LevelSet(path) as levels:
+        assert len(levels) == len(maps)
+        assert all(same_level(a, b) for a, b in zip(levels, maps))
+        assert same_level(levels[-1], maps[-1])
+        assert levels.name(3) == 'level3'
+        with pytest.raises(IndexError):
+            levels[len(maps)]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_encode_decode_round_trip(seed):
+    rng = random.Random(seed)
+    moves = []
+    while len(moves) < 300:
+        # Long runs cross the 16-move limit of one byte
+        moves.extend([rng.randint(1, 8)] * rng.choice([1, 2, 15, 16, 17, 40]))
+    data = encode_moves(moves)
+    assert decode_moves(data) == moves
+    assert len(data) < len(moves)
+
+
+def test_encode_rejects_codes_wider_than_a_nibble():
+    assert encode_moves([]) == b''
+    with pytest.raises(ValueError):
+        encode_moves([1, 16])
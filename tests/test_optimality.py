@@ -0,0 +1,250 @@
+from collections import deque
+import random
+
+import pytest
+from sokoban.map import Map
+from search_methods.a_star import AStarSolver
+from search_methods.ara_star import AnytimeAStarSolver
+from search_methods.hda_star import HDAStarSolver
+from search_methods.ida_star import IDAStarSolver
+from search_methods.level import Level
+from search_methods.push_a_star import PushAStarSolver
+from search_methods.push_idastar import PushIDAStarSolver
+from search_methods.search_state import SearchState
+from search_methods.sma_star import MemoryBoundedAStarSolver
+from search_methods.transitions import PULL_MOVES
+
+
+def bfs_length(crt_map: Map) -> int | None:
+    """
+    Fewest moves (pushes and pulls allowed) solving the map, by plain breadth-first search.
+    """
+    state = SearchState.from_map(crt_map, Level(crt_map))
+    if state.is_solved():
+        return 0
+    seen = {state.hash}
+    queue = deque([(state.player, tuple(state.boxes), state.hash, 0)])
+    while queue:
+        player, boxes, key, depth = queue.popleft()
+        state.load(player, boxes, key)
+        for move in state.legal_moves():
+            box_from = state.do_move(move)
+            if state.hash not in seen:
+                if state.is_solved():
+                    return depth + 1
+                seen.add(state.hash)
+                queue.append((state.player, tuple(state.boxes), state.hash, depth + 1))
+            state.undo_move(move, box_from)
+    return None
+
+
+def bfs_pushes(crt_map: Map) -> int | None:
+    """
+    Fewest pushes solving the map without pulls: 0-1 breadth-first search where
+    walking is free and every push costs one.
+    """
+    state = SearchState.from_map(crt_map, Level(crt_map))
+    best = {state.hash: 0}
+    queue = deque([(state.player, tuple(state.boxes), state.hash, 0)])
+    while queue:
+        player, boxes, key, pushes = queue.popleft()
+        if best[key] < pushes:
+            continue
+        state.load(player, boxes, key)
+        if state.is_solved():
+            return pushes
+        for move in state.legal_moves():
+            if move in PULL_MOVES:
+                continue
+            box_from = state.do_move(move)
+            cost = pushes + (box_from >= 0)
+            if cost < best.get(state.hash, cost + 1):
+                best[state.hash] = cost
+                entry = (state.player, tuple(state.boxes), state.hash, cost)
+                queue.append(entry) if box_from >= 0 else queue.appendleft(entry)
+            state.undo_move(move, box_from)
+    return None
+
+
+def count_pushes(crt_map: Map, moves: list[int]) -> int:
+    final = crt_map.copy()
+    pushes = 0
+    for m in moves:
+        before = dict(final.positions_of_boxes)
+        final.apply_move(m)
+        assert m not in PULL_MOVES
+        pushes += final.positions_of_boxes != before
+    assert final.is_solved()
+    return pushes
+
+
+def random_levels(seed: int, count: int, walls: float = 0.15) -> list[str]:
+    """
+    Small levels with one or two boxes, in Map.from_str form; `walls` is the share of
+    cells that are walls.
+    """
+    rng = random.Random(seed)
+    levels = []
+    while len(levels) < count:
+        rows, cols = rng.randint(3, 5), rng.randint(3, 5)
+        cells = [(x, y) for x in range(rows) for y in range(cols)]
+        grid = {c: '/' if rng.random() < walls else '_' for c in cells}
+        free = [c for c in cells if grid[c] == '_']
+        boxes = rng.randint(1, 2)
+        if len(free) < 2 * boxes + 1:
+            continue
+        picked = rng.sample(free, 2 * boxes + 1)
+        grid[picked[0]] = 'P'
+        for c in picked[1:boxes + 1]:
+            grid[c] = 'B'
+        for c in picked[boxes + 1:]:
+            grid[c] = 'X'
+        levels.append('\n'.join(' '.join(grid[(x, y)] for y in range(cols)) for x in range(rows)))
+    return levels
+
+
+# Levels on which push-distance heuristics overestimate, since pulls are legal
+PULL_LEVELS = [
+    '_ / P _ _\n_ B _ _ _\nX _ _ _ _\nB X _ _ _',
+    '/ X / B _\nP _ _ _ _\n/ _ X B _',
+    'B _ _\n/ X P\n_ X _\n_ _ B\n_ _ _',
+    '_ _ _ _ _\n_ _ _ _ B\n_ _ _ _ P\n_ _ X _ _\n_ _ _ _ _',
+]
+LEVELS = PULL_LEVELS + random_levels(seed=0, count=60)
+
+# Two rooms joined by a one-cell corridor, and a goal room behind a single entrance
+CORRIDOR_LEVEL = '_ _ _ / / / / / / _ _\n_ B _ _ _ _ _ _ _ _ X\nP _ _ / / / / / / _ _'
+GOAL_ROOM_LEVEL = '_ _ _ _ _ / / /\n_ B _ B _ _ X X\n_ _ P _ _ / / /'
+# Denser walls, so that many levels have tunnels
+MACRO_LEVELS = [CORRIDOR_LEVEL, GOAL_ROOM_LEVEL] + random_levels(seed=1, count=60, walls=0.35)
+
+
+def assert_optimal(make_solver, level: str) -> None:
+    crt_map = Map.from_str(level)
+    optimum = bfs_length(crt_map)
+    moves = make_solver(crt_map.copy()).solve()
+    if optimum is None:
+        assert moves is None
+        return
+    assert moves is not None
+    final = crt_map.copy()
+    for m in moves:
+        final.apply_move(m)
+    assert final.is_solved()
+    assert len(moves) == optimum
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_astar_is_optimal(level):
+    assert_optimal(AStarSolver, level)
+
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_idastar_is_optimal(level):
+    assert_optimal(IDAStarSolver, level)
+
+
+# Two worker processes per level, so a smaller sample
+@pytest.mark.parametrize('level', LEVELS[:16])
+def test_hdastar_is_optimal(level):
+    assert_optimal(lambda crt_map: HDAStarSolver(crt_map, workers=2), level)
+
+
+# batch=True falls back to per-child scoring without numpy
+@pytest.mark.parametrize('batch', [False, True])
+@pytest.mark.parametrize('level', LEVELS)
+def test_arastar_bounds_hold(level, batch):
+    crt_map = Map.from_str(level)
+    optimum = bfs_length(crt_map)
+    published = []
+    moves = AnytimeAStarSolver(crt_map.copy(), weight=3.0, batch=batch,
+                               callback=lambda moves, weight, bound: published.append((len(moves), bound))).solve()
+    if optimum is None:
+        assert moves is None
+        return
+    assert len(moves) == optimum
+    for length, bound in published:
+        assert length <= bound * optimum
+        assert bound > 1.0 or length == optimum
+
+
+class TrackedMemoryBoundedAStarSolver(MemoryBoundedAStarSolver):
+    """
+    Records the largest table size seen at the end of an expansion, and the compactions.
+    """
+
+    peak = 0
+    compactions = 0
+
+    def _table_size(self, open_heap: list) -> int:
+        size = super()._table_size(open_heap)
+        self.peak = max(self.peak, size)
+        return size
+
+    def _compact(self, open_heap: list, entry_count: int) -> tuple[list, int]:
+        self.compactions += 1
+        return super()._compact(open_heap, entry_count)
+
+
+def test_smastar_tables_stay_bounded():
+    crt_map = Map.from_str(PULL_LEVELS[1])
+    solver = TrackedMemoryBoundedAStarSolver(crt_map.copy(), max_nodes=100)
+    moves = solver.solve()
+    assert solver.compactions > 0
+    # One expansion adds at most eight children, each to all four tables
+    assert solver.peak <= 100 + 4 * 8
+    assert len(moves) == bfs_length(crt_map)
+
+
+@pytest.mark.parametrize('solver_cls', [PushAStarSolver, PushIDAStarSolver])
+@pytest.mark.parametrize('level', LEVELS)
+def test_pattern_database_keeps_push_solvers_optimal(solver_cls, level, tmp_path, monkeypatch):
+    monkeypatch.setenv('SOKOBAN_PDB_DIR', str(tmp_path))
+    crt_map = Map.from_str(level)
+    optimum = bfs_pushes(crt_map)
+    moves = solver_cls(crt_map.copy(), pattern_size=2, macros=None).solve()
+    if optimum is None:
+        assert moves is None
+    else:
+        assert moves is not None
+        assert count_pushes(crt_map, moves) == optimum
+
+
+@pytest.mark.parametrize('solver_cls', [PushAStarSolver, PushIDAStarSolver])
+@pytest.mark.parametrize('level', MACRO_LEVELS)
+def test_tunnel_macros_keep_push_solvers_optimal(solver_cls, level):
+    crt_map = Map.from_str(level)
+    optimum = bfs_pushes(crt_map)
+    moves = solver_cls(crt_map.copy(), macros='tunnels').solve()
+    if optimum is None:
+        assert moves is None
+    else:
+        assert moves is not None
+        assert count_pushes(crt_map, moves) == optimum
+
+
+@pytest.mark.parametrize('solver_cls', [PushAStarSolver, PushIDAStarSolver])
+@pytest.mark.parametrize('macros', ['tunnels', 'rooms'])
+@pytest.mark.parametrize('level', MACRO_LEVELS)
+def test_macro_solutions_replay(solver_cls, macros, level):
+    crt_map = Map.from_str(level)
+    moves = solver_cls(crt_map.copy(), macros=macros).solve()
+    if moves is not None:
+        count_pushes(crt_map, moves)  # asserts the replay ends solved
+    else:
+        assert bfs_pushes(crt_map) is None
+
+
+@pytest.mark.parametrize('solver_cls', [PushAStarSolver, PushIDAStarSolver])
+def test_tunnel_macros_cut_expansions(solver_cls):
+    expanded = {}
+    for macros in (None, 'tunnels'):
+        solver = solver_cls(Map.from_str(CORRIDOR_LEVEL), macros=macros)
+        assert solver.solve() is not None
+        expanded[macros] = solver.stats.expanded
+    assert expanded['tunnels'] < expanded[None]
+
+
+def test_goal_room_macros_are_opt_in():
+    assert not PushAStarSolver(Map.from_str(GOAL_ROOM_LEVEL)).macros.rooms
+    assert PushAStarSolver(Map.from_str(GOAL_ROOM_LEVEL), macros='rooms').macros.rooms
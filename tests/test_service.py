@@ -0,0 +1,78 @@
+import asyncio
+import json
+import time
+
+import pytest
+from sokoban.map import Map
+from search_methods.simulated_annealing import SimulatedAnnealingSolver
+from search_methods.solver import SolveCancelled
+from service import LocalClient, ServiceBusy, SolveService
+
+EASY_LEVEL = '_ / P _ _\n_ B _ _ _\nX _ _ _ _\nB X _ _ _'
+# Takes A* a few seconds, so it is still running when a test stops it
+HARD_LEVEL = '\n'.join(' '.join(row) for row in
+                       ['_______', '_B_B_B_', '_______', 'X__P__X', '_______', '_B___X_', '___X___'])
+
+
+def run(test, **service_options):
+    async def main():
+        async with SolveService(in_process=True, **service_options) as service:
+            return await test(LocalClient(service))
+    return asyncio.run(main())
+
+
+def test_completed_solve():
+    record = run(lambda client: client.solve(EASY_LEVEL, 'astar'), workers=1)
+    assert record['status'] == 'solved'
+    final = Map.from_str(EASY_LEVEL)
+    for move in record['moves']:
+        final.apply_move(move)
+    assert final.is_solved()
+
+
+def test_deadline_expires():
+    record = run(lambda client: client.solve(HARD_LEVEL, 'astar', deadline=0.2), workers=1, every=100)
+    assert record['status'] == 'deadline'
+    assert record['moves'] is None
+
+
+def test_cancel_while_streaming_progress():
+    async def test(client):
+        job_id = await client.submit(HARD_LEVEL, 'astar')
+        kinds = []
+        async for line in client.stream(job_id):
+            event = json.loads(line)
+            kinds.append(event['event'])
+            if event['event'] == 'progress' and kinds.count('progress') == 1:
+                assert await client.cancel(job_id)
+        return kinds, event
+
+    kinds, done = run(test, workers=1, every=100)
+    assert kinds[:2] == ['queued', 'started']
+    assert 'progress' in kinds
+    assert done['event'] == 'done' and done['status'] == 'cancelled'
+
+
+def test_full_queue_pushes_back():
+    async def test(client):
+        running = await client.submit(HARD_LEVEL, 'astar')
+        while client.service.jobs[running].status != 'running':
+            await asyncio.sleep(0.01)
+        waiting = await client.submit(HARD_LEVEL, 'astar')
+        with pytest.raises(ServiceBusy):
+            await client.submit(EASY_LEVEL, 'astar')
+        assert await client.cancel(waiting)
+        assert waiting not in client.service.jobs  # answered 'cancelled' without running
+        assert await client.cancel(running)
+        return await client.result(running)
+
+    assert run(test, workers=1, max_queue=1, every=100)['status'] == 'cancelled'
+
+
+def test_parallel_annealing_stops_at_checkpoints():
+    started = time.time()
+    solver = SimulatedAnnealingSolver(Map.from_str(HARD_LEVEL))
+    solver.cancellable(lambda: 'deadline' if time.time() - started > 0.3 else None)
+    with pytest.raises(SolveCancelled):
+        solver.solve(max_iter=10 ** 8, restarts=8, workers=2)
+    assert time.time() - started < 5